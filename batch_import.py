@@ -0,0 +1,152 @@
+"""
+Bulk import of recorded scan payloads
+"""
+
+import os
+import logging
+from dataclasses import dataclass, field
+
+import pandas
+
+import constants
+import decoder
+import key_index
+import schema
+
+
+@dataclass
+class BatchResult:
+    """
+    Summary of a batch import
+    """
+
+    added: dict[str, int] = field(default_factory=dict)
+    duplicates: int = 0
+    errors: list[tuple[str, constants.DataError]] = field(default_factory=list)
+
+    @property
+    def total_added(self) -> int:
+        """
+        Number of rows added across all forms
+        """
+        return sum(self.added.values())
+
+
+def read_payloads(path: str) -> list[tuple[str, str]]:
+    """Read newline-delimited payloads from a file or every file in a directory
+
+    Args:
+        path (str): File or directory path
+
+    Returns:
+        list[tuple[str, str]]: (file:line, payload) for every non-empty line
+    """
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name)
+            for name in os.listdir(path)
+            if os.path.isfile(os.path.join(path, name))
+        )
+    else:
+        files = [path]
+
+    payloads = []
+    for file_path in files:
+        with open(file_path, "r", encoding="utf-8", errors="replace") as file:
+            for line_number, line in enumerate(file, 1):
+                if line.strip():
+                    payloads.append((f"{file_path}:{line_number}", line))
+    return payloads
+
+
+def import_payloads(
+    payloads: list[tuple[str, str]],
+    data_frames: dict[str, pandas.DataFrame],
+    index: key_index.KeyIndex,
+    payload_decoder: decoder.PayloadDecoder,
+) -> BatchResult:
+    """Decode payloads and add them to the data frames in one step per form
+
+    Repeats of already ingested scans, or of earlier scans in the batch, are
+    skipped rather than prompted for.
+
+    Args:
+        payloads (list[tuple[str, str]]): (location, payload) pairs
+        data_frames (dict[str, pandas.DataFrame]): Data for each form, updated
+                                                   in place
+        index (key_index.KeyIndex): Dedupe index, updated in place
+        payload_decoder (decoder.PayloadDecoder): Decoder to use
+
+    Returns:
+        BatchResult: Summary of the import
+    """
+    result = BatchResult()
+    rows: dict[str, list[list]] = {form: [] for form in schema.HEADERS}
+    locations: dict[str, list[str]] = {form: [] for form in schema.HEADERS}
+    row_keys: dict[str, list] = {form: [] for form in schema.HEADERS}
+    keys: dict[str, set] = {form: set() for form in schema.HEADERS}
+
+    for location, payload in payloads:
+        decoded = payload_decoder.decode(payload)
+        error = decoder.validate(decoded)
+        if error:
+            logging.error("%s: %s %s", location, error.name, decoded.errors)
+            result.errors.append((location, error))
+            continue
+
+        key = index.record_key(decoded.form, decoded.record)
+        if index.contains(decoded.form, key) or (
+            key is not None and key in keys[decoded.form]
+        ):
+            result.duplicates += 1
+            continue
+
+        if key is not None:
+            keys[decoded.form].add(key)
+        rows[decoded.form].append(decoded.values)
+        locations[decoded.form].append(location)
+        row_keys[decoded.form].append(key)
+
+    for form, form_rows in rows.items():
+        if not form_rows:
+            result.added[form] = 0
+            continue
+
+        try:
+            frame = schema.from_values(form_rows, form)
+            added_keys = row_keys[form]
+        except schema.SchemaError:
+            frame, added_keys = _convert_rows(
+                form, form_rows, locations[form], row_keys[form], result
+            )
+        result.added[form] = len(frame)
+        data_frames[form] = schema.concat(data_frames[form], frame)
+        for key in added_keys:
+            if key is not None:
+                index.add(form, key)
+
+    logging.info(
+        "Batch import added %s, %s duplicates, %s errors",
+        result.added,
+        result.duplicates,
+        len(result.errors),
+    )
+    return result
+
+
+def _convert_rows(
+    form: str, rows: list[list], locations: list[str], keys: list, result: BatchResult
+) -> tuple[pandas.DataFrame, list]:
+    # slow path, only taken when some row has a number out of its column's range
+    good = []
+    good_keys = []
+    for location, values, key in zip(locations, rows, keys):
+        try:
+            schema.from_values([values], form)
+        except schema.SchemaError as error:
+            logging.error("%s: DATA_MALFORMED %s", location, error)
+            result.errors.append((location, constants.DataError.DATA_MALFORMED))
+            continue
+        good.append(values)
+        good_keys.append(key)
+    return schema.from_values(good, form), good_keys
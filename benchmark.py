@@ -0,0 +1,414 @@
+"""
+Headless ingest benchmarks
+
+Times each stage of the scan ingest path on its own at several data sizes and
+prints machine-readable JSON, e.g.
+
+    python benchmark.py --sizes 100 1000 10000 50000 --output bench.json
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import datetime
+import tempfile
+import statistics
+
+import pandas
+
+import batch_import
+import decoder
+import delta_sync
+import ingest
+import key_index
+import mirror
+import scan_generator
+import schema
+import snapshot
+import storage
+
+DEFAULT_SIZES = [100, 1000, 10000, 50000]
+EVENT_ID = "2024bench"
+FLUSH_TIMEOUT = 60.0  # seconds the disk mirror may take to catch up
+
+
+def summarize(samples: list[int]) -> dict[str, float]:
+    """Summarize stage timings
+
+    Args:
+        samples (list[int]): Timings in nanoseconds
+
+    Returns:
+        dict[str, float]: Mean, median, 95th percentile and max in microseconds
+    """
+    ordered = sorted(samples)
+    return {
+        "mean_us": statistics.fmean(ordered) / 1000,
+        "p50_us": ordered[len(ordered) // 2] / 1000,
+        "p95_us": ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)] / 1000,
+        "max_us": ordered[-1] / 1000,
+    }
+
+
+def flush(disk_mirror: mirror.DiskMirror) -> None:
+    """Wait for a disk mirror to write everything submitted
+
+    Args:
+        disk_mirror (mirror.DiskMirror): Mirror to wait for
+
+    Raises:
+        RuntimeError: If the writes fail or take longer than `FLUSH_TIMEOUT`
+    """
+    if not disk_mirror.flush(FLUSH_TIMEOUT) or disk_mirror.errors():
+        raise RuntimeError(f"Disk mirror did not finish: {disk_mirror.errors()}")
+
+
+class StageTimer:
+    """
+    Collect per-stage timings
+    """
+
+    def __init__(self) -> None:
+        self.samples: dict[str, list[int]] = {}
+        self._last = 0
+
+    def start(self) -> None:
+        """
+        Start timing the first stage
+        """
+        self._last = time.perf_counter_ns()
+
+    def lap(self, stage: str) -> None:
+        """Record the time since the previous lap as `stage`
+
+        Args:
+            stage (str): Stage name
+        """
+        now = time.perf_counter_ns()
+        self.samples.setdefault(stage, []).append(now - self._last)
+        self._last = now
+
+    def results(self) -> dict[str, dict[str, float]]:
+        """
+        Summaries for every stage
+        """
+        return {stage: summarize(samples) for stage, samples in self.samples.items()}
+
+
+def preload(
+    generator: scan_generator.ScanGenerator, form: str, size: int
+) -> tuple[dict[str, pandas.DataFrame], key_index.KeyIndex]:
+    """Build data frames and an index already holding `size` scans of a form
+
+    Args:
+        generator (scan_generator.ScanGenerator): Payload generator
+        form (str): Form name
+        size (int): Number of existing rows
+
+    Returns:
+        tuple[dict[str, pandas.DataFrame], key_index.KeyIndex]: Frames and index
+    """
+    data_frames = {name: schema.empty_frame(name) for name in schema.HEADERS}
+    index = key_index.KeyIndex()
+    batch_import.import_payloads(
+        [("generated", payload) for payload in generator.payloads(form, size)],
+        data_frames,
+        index,
+        decoder.PayloadDecoder(),
+    )
+    return data_frames, index
+
+
+def bench_ingest(
+    generator: scan_generator.ScanGenerator,
+    form: str,
+    size: int,
+    scans: int,
+    durability: storage.Durability = storage.Durability.BUFFERED,
+) -> dict[str, dict[str, float]]:
+    """Time the per-scan ingest path against `size` existing rows
+
+    Args:
+        generator (scan_generator.ScanGenerator): Payload generator
+        form (str): Form name
+        size (int): Number of existing rows
+        scans (int): Number of scans to time
+        durability (storage.Durability, optional): Durability policy of the
+                                                   transfer directory writer.
+                                                   Defaults to BUFFERED.
+
+    Returns:
+        dict[str, dict[str, float]]: Summary for each stage, "disk_mirror" is
+                                     queueing the scan and "disk_write" waiting
+                                     for the mirror to write it, which the app
+                                     does in the background
+    """
+    data_frames, index = preload(generator, form, size)
+    payload_decoder = decoder.PayloadDecoder()
+    writer = ingest.new_writer(durability)
+    disk_mirror = mirror.DiskMirror(ingest.new_writer(durability))
+    workdir = tempfile.mkdtemp(prefix="scouting_bench_")
+    transfer_dir = os.path.join(workdir, "transfer")
+    disk_dir = os.path.join(workdir, "disk")
+
+    try:
+        writer.compact(transfer_dir, form, EVENT_ID, data_frames[form])
+        # the mirror won't create a missing mountpoint, it retries forever
+        os.makedirs(disk_dir)
+        disk_mirror.submit(disk_dir, form, EVENT_ID, data_frames[form], True)
+        flush(disk_mirror)
+
+        buffer = schema.FrameBuffer(form, data_frames[form])
+        timer = StageTimer()
+        for payload in generator.payloads(form, scans, start=size):
+            timer.start()
+            decoded = payload_decoder.decode(payload)
+            timer.lap("decode")
+
+            if decoder.validate(decoded):
+                raise RuntimeError(f"Generated payload is invalid: {decoded.errors}")
+            timer.lap("validate")
+
+            key = index.record_key(form, decoded.record)
+            if index.contains(form, key):
+                raise RuntimeError(f"Generated payload is a repeat: {key}")
+            timer.lap("dedupe")
+
+            data_frames[form] = buffer.append([decoded.values])
+            index.add(form, key)
+            timer.lap("append")
+
+            writer.append(transfer_dir, form, EVENT_ID, data_frames[form])
+            timer.lap("csv_write")
+
+            disk_mirror.submit(disk_dir, form, EVENT_ID, data_frames[form])
+            timer.lap("disk_mirror")
+
+            flush(disk_mirror)
+            timer.lap("disk_write")
+        flush(disk_mirror)
+        writer.close()
+    finally:
+        disk_mirror.close(timeout=0)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    results = timer.results()
+    results["total"] = summarize(
+        [sum(stage[i] for stage in timer.samples.values()) for i in range(scans)]
+    )
+    return results
+
+
+def bench_reload(
+    generator: scan_generator.ScanGenerator, form: str, size: int, repeats: int = 5
+) -> dict[str, dict[str, float]]:
+    """Time reloading `size` rows of a form from CSV and from its snapshot
+
+    Args:
+        generator (scan_generator.ScanGenerator): Payload generator
+        form (str): Form name
+        size (int): Number of rows
+        repeats (int, optional): Loads timed per method. Defaults to 5.
+
+    Returns:
+        dict[str, dict[str, float]]: Summary for each method, "snapshot_tail"
+                                     has 1% of the rows appended to the CSV
+                                     after the snapshot
+    """
+    data_frames, _ = preload(generator, form, size)
+    tail, _ = preload(generator, form, size + max(size // 100, 1))
+    workdir = tempfile.mkdtemp(prefix="scouting_bench_")
+    path = storage.totals_path(workdir, form, EVENT_ID)
+    writer = storage.TotalsWriter()
+    samples: dict[str, list[int]] = {}
+
+    def time_load(method: str, load) -> None:
+        for _ in range(repeats):
+            start = time.perf_counter_ns()
+            load()
+            samples.setdefault(method, []).append(time.perf_counter_ns() - start)
+
+    try:
+        writer.compact(workdir, form, EVENT_ID, data_frames[form])
+        time_load("csv", lambda: schema.read_csv(path, form))
+
+        if snapshot.available():
+            snapshot.write(workdir, form, EVENT_ID, data_frames[form])
+            time_load("snapshot", lambda: snapshot.read(workdir, form, EVENT_ID))
+
+            writer.append(workdir, form, EVENT_ID, tail[form])
+            time_load("snapshot_tail", lambda: snapshot.read(workdir, form, EVENT_ID))
+        writer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {method: summarize(times) for method, times in samples.items()}
+
+
+def bench_sync(
+    generator: scan_generator.ScanGenerator, form: str, size: int, repeats: int = 5
+) -> dict[str, dict[str, float]]:
+    """Time bringing a disk copy of `size` rows up to date
+
+    Args:
+        generator (scan_generator.ScanGenerator): Payload generator
+        form (str): Form name
+        size (int): Number of rows
+        repeats (int, optional): Syncs timed per method. Defaults to 5.
+
+    Returns:
+        dict[str, dict[str, float]]: Summary for each method, "full" rewrites
+                                     the file, "delta" syncs a disk that is
+                                     already up to date and "delta_tail" one
+                                     that is missing 1% of the rows
+    """
+    data_frames, _ = preload(generator, form, size)
+    tail, _ = preload(generator, form, size + max(size // 100, 1))
+    workdir = tempfile.mkdtemp(prefix="scouting_bench_")
+    writer = storage.TotalsWriter()
+    samples: dict[str, list[int]] = {}
+
+    def time_sync(method: str, frame: pandas.DataFrame, prepare) -> None:
+        for _ in range(repeats):
+            files = prepare()
+            start = time.perf_counter_ns()
+            if method == "full":
+                writer.compact(workdir, form, EVENT_ID, frame)
+            else:
+                delta_sync.sync(writer, files, workdir, form, EVENT_ID, frame)
+            samples.setdefault(method, []).append(time.perf_counter_ns() - start)
+
+    def disk_copy() -> dict[str, dict]:
+        files: dict[str, dict] = {}
+        writer.compact(workdir, form, EVENT_ID, data_frames[form])
+        delta_sync.update(files, workdir, form, EVENT_ID, data_frames[form])
+        return files
+
+    try:
+        time_sync("full", data_frames[form], dict)
+        time_sync("delta", data_frames[form], disk_copy)
+        time_sync("delta_tail", tail[form], disk_copy)
+        writer.close()
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    return {method: summarize(times) for method, times in samples.items()}
+
+
+def run(
+    sizes: list[int],
+    forms: list[str],
+    scans: int,
+    seed: int,
+    durabilities: list[storage.Durability] | None = None,
+) -> dict:
+    """Run the benchmark suite
+
+    Args:
+        sizes (list[int]): Existing row counts to test at
+        forms (list[str]): Forms to test
+        scans (int): Scans timed per size
+        seed (int): Generator seed
+        durabilities (list[storage.Durability] | None, optional): Durability
+            policies to test. Defaults to all of them.
+
+    Returns:
+        dict: JSON-serializable results
+    """
+    generator = scan_generator.ScanGenerator(seed=seed, event=EVENT_ID)
+    results = []
+    for durability in durabilities or list(storage.Durability):
+        for form in forms:
+            for size in sizes:
+                logging.info(
+                    "Benchmarking %s at %s rows, %s", form, size, durability.value
+                )
+                results.append(
+                    {
+                        "form": form,
+                        "size": size,
+                        "scans": scans,
+                        "durability": durability.value,
+                        "stages": bench_ingest(
+                            generator, form, size, scans, durability
+                        ),
+                    }
+                )
+
+    reload = []
+    for form in forms:
+        for size in sizes:
+            logging.info("Benchmarking %s reload at %s rows", form, size)
+            reload.append(
+                {
+                    "form": form,
+                    "size": size,
+                    "methods": bench_reload(generator, form, size),
+                }
+            )
+
+    sync = []
+    for form in forms:
+        for size in sizes:
+            logging.info("Benchmarking %s disk sync at %s rows", form, size)
+            sync.append(
+                {
+                    "form": form,
+                    "size": size,
+                    "methods": bench_sync(generator, form, size),
+                }
+            )
+
+    return {
+        "meta": {
+            "timestamp": datetime.datetime.now().isoformat(),
+            "python": platform.python_version(),
+            "pandas": pandas.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+        },
+        "results": results,
+        "reload": reload,
+        "sync": sync,
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    """
+    Command-line entry point
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument(
+        "--forms", nargs="+", default=["qual"], choices=list(schema.HEADERS)
+    )
+    parser.add_argument("--scans", type=int, default=200, help="scans timed per size")
+    parser.add_argument("--seed", type=int, default=6369)
+    parser.add_argument(
+        "--durability",
+        nargs="+",
+        default=[policy.value for policy in storage.Durability],
+        choices=[policy.value for policy in storage.Durability],
+    )
+    parser.add_argument("--output", help="write JSON here instead of stdout")
+    args = parser.parse_args(argv)
+
+    durabilities = [storage.Durability(policy) for policy in args.durability]
+    output = json.dumps(
+        run(args.sizes, args.forms, args.scans, args.seed, durabilities), indent=2
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    main()
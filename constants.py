@@ -5,8 +5,6 @@ Constant values for scouting transfer
 import typing
 import enum
 
-from PyQt6.QtSerialPort import QSerialPort
-
 BAUDS: typing.Final = [
     300,
     600,
@@ -25,32 +23,30 @@ BAUDS: typing.Final = [
     921600,
 ]
 
-DATA_BITS: typing.Final = {
-    "5 Data Bits": QSerialPort.DataBits.Data5,
-    "6 Data Bits": QSerialPort.DataBits.Data6,
-    "7 Data Bits": QSerialPort.DataBits.Data7,
-    "8 Data Bits": QSerialPort.DataBits.Data8,
-}
+MAX_FRAME_SIZE: typing.Final = 16 * 1024  # bytes
+
+INGEST_QUEUE_SIZE: typing.Final = 64
+INGEST_SPILL_FILE: typing.Final = "ingest_spill.txt"
+
+TOTALS_COMPACT_INTERVAL: typing.Final = 250  # appends between full rewrites
+
+LOAD_CACHE_SIZE: typing.Final = 12  # forms kept in memory across event switches
+LOAD_DEBOUNCE: typing.Final = 400  # ms of quiet before loading a typed path
 
-STOP_BITS: typing.Final = {
-    "1 Stop Bits": QSerialPort.StopBits.OneStop,
-    "1.5 Stop Bits": QSerialPort.StopBits.OneAndHalfStop,
-    "2 Stop Bits": QSerialPort.StopBits.TwoStop,
-}
+DURABILITY_GROUP_SIZE: typing.Final = 16  # appends per fsync in group commit mode
+DURABILITY_GROUP_INTERVAL: typing.Final = 1.0  # max seconds between group commits
 
-PARITY: typing.Final = {
-    "No Parity": QSerialPort.Parity.NoParity,
-    "Even Parity": QSerialPort.Parity.EvenParity,
-    "Odd Parity": QSerialPort.Parity.OddParity,
-    "Mark Parity": QSerialPort.Parity.MarkParity,
-    "Space Parity": QSerialPort.Parity.SpaceParity,
-}
+MIRROR_RETRY_INTERVAL: typing.Final = 2.0  # seconds before retrying a failed disk
+MIRROR_LAG_INTERVAL: typing.Final = 500  # ms between mirror lag updates
+STARTUP_REPORT_TIMEOUT: typing.Final = 10000  # ms the startup time is shown for
+MIRROR_WORKERS: typing.Final = 4  # disks written at the same time
+SYNC_BLOCK_ROWS: typing.Final = 256  # rows per block in a disk's sync manifest
+SYNC_MANIFEST_INTERVAL: typing.Final = 5.0  # max seconds a manifest lags appends
 
-FLOW_CONTROL: typing.Final = {
-    "No Flow Control": QSerialPort.FlowControl.NoFlowControl,
-    "Software FC": QSerialPort.FlowControl.SoftwareControl,
-    "Hardware FC": QSerialPort.FlowControl.HardwareControl,
-}
+DISK_SCAN_INTERVAL: typing.Final = 1000  # ms between mount table checks
+DISK_PROBE_TIMEOUT: typing.Final = 2.0  # seconds a mount may take to answer a scan
+DISK_QUARANTINE_BACKOFF: typing.Final = 5.0  # first retry delay for a hung mount
+DISK_QUARANTINE_MAX: typing.Final = 300.0  # longest retry delay for a hung mount
 
 PIT_DATA_HEADER: typing.Final = [
     "form",
@@ -184,3 +180,4 @@ class DataError(enum.Enum):
     UNKNOWN_FORM = 1
     TEAM_NUMBER_NULL = 2
     MATCH_NUMBER_NULL = 3
+    DIRECTORY_MISSING = 4
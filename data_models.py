@@ -2,71 +2,107 @@
 Qt data model for a pandas DataFrame
 """
 
-import math
-
-from PyQt6.QtCore import Qt
-from PyQt6.QtGui import QStandardItem, QStandardItemModel, QIcon
-import qtawesome
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QIcon
 
 import pandas
+from pandas.api import types
+
+import icon_cache
 
 
-class PandasModel(QStandardItemModel):
+class PandasModel(QAbstractTableModel):
     """
-    Qt data model for a pandas DataFrame
+    Virtual Qt table model for a pandas DataFrame
+
+    Cells are served on demand from per-column value lists, nothing is
+    materialized per cell so only the rows the view paints are ever touched.
+    Single rows can be appended without resetting the model.
     """
 
     def __init__(self, data: pandas.DataFrame, parent=None):
-        QStandardItemModel.__init__(self, parent)
-        self._data = data
-        for row in data.values.tolist():
-            data_row = [QStandardItem(str(x)) for x in row]
-            self.appendRow(data_row)
-        return
+        super().__init__(parent)
+        self._header: list[str] = []
+        self._index: list = []
+        self._columns: list[list] = []
+        self._take(data)
 
-    def rowCount(self, _=None):
-        return len(self._data.values)
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._index)
 
-    def columnCount(self, _=None):
-        return self._data.columns.size
+    def columnCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._header)
 
     def load_data(self, data: pandas.DataFrame):
-        self._data = data
-        for i, row in enumerate(self._data.values.tolist()):
-            for j, value in enumerate(row):
-                item = self.item(i, j)
-                if isinstance(value, float) and math.isnan(value):
-                    icon = qtawesome.icon("mdi6.null")
-                elif isinstance(value, bool):
-                    icon = qtawesome.icon("mdi6.circle", color="#4caf50" if value else "#f44336")
-                elif isinstance(value, float):
-                    icon = qtawesome.icon("mdi6.decimal")
-                elif isinstance(value, int):
-                    icon = qtawesome.icon("mdi6.pound")
-                elif isinstance(value, str) and j == 0:
-                    icon = qtawesome.icon("mdi6.apple-keyboard-command")
-                elif isinstance(value, str):
-                    icon = qtawesome.icon("mdi6.code-string")
-                else:
-                    icon = QIcon()
-
-                if item:
-                    item.setText(str(value))
-                    item.setIcon(icon)
-                else:
-                    stditem = QStandardItem(str(value))
-                    stditem.setIcon(icon)
-                    self.setItem(i, j, stditem)
-
-    def headerData(self, x, orientation, role):
+        """Replace the frame shown by the model
+
+        Args:
+            data (pandas.DataFrame): New data
+        """
+        self.beginResetModel()
+        self._take(data)
+        self.endResetModel()
+
+    def append_row(self, label, values: list):
+        """Append one row to the end of the model
+
+        Args:
+            label (Any): Index label of the row
+            values (list): Row values, one per column
+        """
+        row = len(self._index)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._index.append(label)
+        for column, value in zip(self._columns, values):
+            column.append(value)
+        self.endInsertRows()
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+
+        if role == Qt.ItemDataRole.DisplayRole:
+            return str(self._columns[index.column()][index.row()])
+        if role == Qt.ItemDataRole.DecorationRole:
+            return self._type_icon(
+                self._columns[index.column()][index.row()], index.column()
+            )
+        return None
+
+    def headerData(self, x, orientation, role=Qt.ItemDataRole.DisplayRole):
         if (
             orientation == Qt.Orientation.Horizontal
             and role == Qt.ItemDataRole.DisplayRole
         ):
-            return self._data.columns[x]
+            return self._header[x]
         if (
             orientation == Qt.Orientation.Vertical
             and role == Qt.ItemDataRole.DisplayRole
         ):
-            return self._data.index[x]
+            return str(self._index[x])
         return None
+
+    def _type_icon(self, value, column: int) -> QIcon:
+        if value is None or (types.is_scalar(value) and pandas.isna(value)):
+            return icon_cache.icon("mdi6.null")
+        if types.is_bool(value):
+            return icon_cache.icon("mdi6.circle", "#4caf50" if value else "#f44336")
+        if types.is_float(value):
+            return icon_cache.icon("mdi6.decimal")
+        if types.is_integer(value):
+            return icon_cache.icon("mdi6.pound")
+        if isinstance(value, str) and column == 0:
+            return icon_cache.icon("mdi6.apple-keyboard-command")
+        if isinstance(value, str):
+            return icon_cache.icon("mdi6.code-string")
+        return QIcon()
+
+    def _take(self, data: pandas.DataFrame):
+        # plain lists keep appends O(1) and avoid DataFrame.iat on every paint
+        self._header = [str(column) for column in data.columns]
+        self._index = data.index.tolist()
+        self._columns = [data.iloc[:, i].tolist() for i in range(data.columns.size)]
@@ -0,0 +1,204 @@
+"""
+Schema-driven decoder for raw scan payloads
+"""
+
+import re
+import typing
+from dataclasses import dataclass, field
+
+import constants
+import schema
+
+_FLOAT_RE: typing.Final = re.compile(r"[+-]?(\d+\.?\d*|\.\d+)([eE][+-]?\d+)?")
+_BOOL_VALUES: typing.Final = {"true": True, "false": False, "1": True, "0": False}
+_NULL_VALUES: typing.Final = {"", "null"}  # tablets send null for empty fields
+_INT_RANGE: typing.Final = range(-(2**15), 2**15)  # schema.INT is Int16
+
+# sentinel for values that don't parse, None is a valid (missing) value
+_INVALID: typing.Final = object()
+
+
+@dataclass
+class FieldError:
+    """
+    A payload field that doesn't fit its column's type
+    """
+
+    column: str
+    value: str
+    dtype: str
+
+    def __str__(self) -> str:
+        return f"{self.column}: can't convert {self.value!r} to {self.dtype}"
+
+
+@dataclass
+class DecodeResult:
+    """
+    Output of decoding one payload
+    """
+
+    form: str
+    values: list = field(default_factory=list)
+    errors: list[FieldError] = field(default_factory=list)
+    unknown_form: bool = False
+    wrong_length: bool = False
+
+    @property
+    def record(self) -> dict:
+        """
+        Values keyed by column name
+        """
+        return dict(zip(schema.HEADERS[self.form], self.values))
+
+    @property
+    def ok(self) -> bool:
+        """
+        Whether the payload decoded cleanly
+        """
+        return not (self.errors or self.unknown_form or self.wrong_length)
+
+
+def _parse_int(text: str):
+    text = text.strip()
+    if text.lower() in _NULL_VALUES:
+        return None
+    if _FLOAT_RE.fullmatch(text) is None:
+        return _INVALID
+    number = float(text)
+    if not number.is_integer() or int(number) not in _INT_RANGE:
+        return _INVALID
+    return int(number)
+
+
+def _parse_float(text: str):
+    text = text.strip()
+    if text.lower() in _NULL_VALUES:
+        return None
+    if _FLOAT_RE.fullmatch(text) is None:
+        return _INVALID
+    return float(text)
+
+
+def _parse_bool(text: str):
+    text = text.strip().lower()
+    if text in _NULL_VALUES:
+        return None
+    return _BOOL_VALUES.get(text, _INVALID)
+
+
+def _parse_text(text: str):
+    if text.strip().lower() in _NULL_VALUES:
+        return None
+    return text
+
+
+_PARSERS: typing.Final = {
+    schema.INT: _parse_int,
+    schema.FLOAT: _parse_float,
+    schema.BOOL: _parse_bool,
+    schema.CATEGORY: _parse_text,
+    schema.STRING: _parse_text,
+}
+
+
+def validate(result: DecodeResult) -> constants.DataError | None:
+    """Check a decoded payload before it is ingested
+
+    Args:
+        result (DecodeResult): Output of `PayloadDecoder.decode`
+
+    Returns:
+        constants.DataError | None: Problem with the payload, None if it is valid
+    """
+    if result.unknown_form:
+        return constants.DataError.UNKNOWN_FORM
+    if not result.ok:
+        return constants.DataError.DATA_MALFORMED
+
+    record = result.record
+    if record["teamNumber"] in (None, "frcnull"):
+        return constants.DataError.TEAM_NUMBER_NULL
+    if "matchNumber" in record and record["matchNumber"] is None:
+        return constants.DataError.MATCH_NUMBER_NULL
+    return None
+
+
+class PayloadDecoder:  # pylint: disable=too-few-public-methods
+    """
+    Decode "||"-separated payloads straight to each column's declared type
+
+    One parser per column is compiled from the schema when the decoder is
+    created. Text columns are never coerced, so a comment that looks like a
+    number stays a string. "null" is missing in every column type.
+    """
+
+    def __init__(self) -> None:
+        self._columns = {
+            form: [
+                (column, dtype, _PARSERS[dtype])
+                for column, dtype in schema.dtypes(form).items()
+            ]
+            for form in schema.HEADERS
+        }
+
+    def decode(self, payload: str) -> DecodeResult:
+        """Decode a payload
+
+        Args:
+            payload (str): Raw payload as scanned
+
+        Returns:
+            DecodeResult: Decoded values and any per-field errors
+        """
+        fields = payload.strip("\r\n").split("||")
+        form = fields[0]
+
+        if form not in self._columns:
+            return DecodeResult(form, unknown_form=True)
+
+        columns = self._columns[form]
+        if len(fields) != len(columns):
+            return DecodeResult(form, wrong_length=True)
+
+        result = DecodeResult(form)
+        for text, (column, dtype, parser) in zip(fields, columns):
+            if text == "":
+                result.values.append(None)
+                continue
+
+            value = parser(text)
+            if value is _INVALID:
+                result.errors.append(FieldError(column, text, dtype))
+                value = None
+            result.values.append(value)
+
+        return result
+
+
+if __name__ == "__main__":
+    import timeit
+
+    import utils  # pylint: disable=ungrouped-imports
+
+    SAMPLE = {
+        schema.INT: "3",
+        schema.FLOAT: "2.5",
+        schema.BOOL: "true",
+        schema.CATEGORY: "blue1",
+        schema.STRING: "drove well, dropped 2 notes",
+    }
+    qual_payload = "||".join(
+        "qual" if column == "form" else SAMPLE[dtype]
+        for column, dtype in schema.dtypes("qual").items()
+    )
+    decoder = PayloadDecoder()
+
+    NUMBER = 20000
+    legacy = timeit.timeit(
+        lambda: list(utils.convert_types(qual_payload.strip("\r\n").split("||"))),
+        number=NUMBER,
+    )
+    compiled = timeit.timeit(lambda: decoder.decode(qual_payload), number=NUMBER)
+    print(f"convert_types:  {legacy / NUMBER * 1e6:.1f} us/payload")
+    print(f"PayloadDecoder: {compiled / NUMBER * 1e6:.1f} us/payload")
@@ -0,0 +1,336 @@
+"""
+Delta sync of totals files to removable disks
+
+Every scouting disk keeps a manifest, scout_sync_manifest.json, that describes
+each totals file on it as blocks of `constants.SYNC_BLOCK_ROWS` rows with the
+byte offset, length and sha1 of every block. When a disk comes back the file is
+compared with the in-memory frame block by block, from the last block that was
+full when the manifest was written, and only changed blocks and the missing
+tail are written. Kept blocks are checked against the old manifest first, and
+written bytes are read back and checked against the new one before it replaces
+the old one.
+"""
+
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass
+
+import pandas
+
+import constants
+import storage
+
+MANIFEST_FILE = "scout_sync_manifest.json"
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class SyncResult:
+    """
+    What a sync had to write
+    """
+
+    blocks: int  # blocks written
+    written: int  # bytes written
+    full: bool  # whole file rewritten
+
+
+def manifest_path(directory: str) -> str:
+    """Get the path of a disk's manifest
+
+    Args:
+        directory (str): Disk mountpoint
+
+    Returns:
+        str: Path to scout_sync_manifest.json
+    """
+    return os.path.join(directory, MANIFEST_FILE)
+
+
+def read_manifest(directory: str) -> dict[str, dict]:
+    """Read a disk's manifest
+
+    Args:
+        directory (str): Disk mountpoint
+
+    Returns:
+        dict[str, dict]: Entry for each totals file, by path relative to the
+                         disk. Empty if there is no usable manifest.
+    """
+    path = manifest_path(directory)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as error:
+        logging.warning("Ignoring manifest %s: %s", path, error)
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest.get("files", {})
+
+
+def write_manifest(
+    directory: str, files: dict[str, dict], durability: storage.Durability
+) -> None:
+    """Replace a disk's manifest
+
+    Args:
+        directory (str): Disk mountpoint
+        files (dict[str, dict]): Entry for each totals file
+        durability (storage.Durability): Whether to fsync the manifest
+    """
+    path = manifest_path(directory)
+    with open(f"{path}.tmp", "w", encoding="utf-8") as file:
+        json.dump({"version": MANIFEST_VERSION, "files": files}, file)
+        if durability != storage.Durability.BUFFERED:
+            file.flush()
+            os.fsync(file.fileno())
+    os.replace(f"{path}.tmp", path)
+
+
+def _records(text: str) -> list[str]:
+    # a line break only ends a record outside quotes, i.e. after an even number
+    records = []
+    pending: list[str] = []
+    quotes = 0
+    for line in text.split("\n")[:-1]:
+        pending.append(line)
+        quotes += line.count('"')
+        if quotes % 2 == 0:
+            records.append("\n".join(pending) + "\n")
+            pending = []
+            quotes = 0
+    return records
+
+
+def render(frame: pandas.DataFrame, start: int = 0) -> list[bytes]:
+    """Render a frame as the blocks of its totals file
+
+    Args:
+        frame (pandas.DataFrame): Full frame for the form
+        start (int, optional): First block to render. Defaults to 0.
+
+    Returns:
+        list[bytes]: CSV bytes of each block, block 0 is the header
+    """
+    size = constants.SYNC_BLOCK_ROWS
+    first = max(start - 1, 0) * size
+    # one to_csv call, per-block calls are several times slower
+    records = _records(frame.iloc[first:].to_csv(header=start == 0, index=False))
+
+    blocks = []
+    if start == 0:
+        blocks.append(records.pop(0).encode())
+    for begin in range(0, len(records), size):
+        blocks.append("".join(records[begin : begin + size]).encode())
+    return blocks
+
+
+def describe(blocks: list[bytes], offset: int = 0) -> list[dict]:
+    """Describe blocks for a manifest
+
+    Args:
+        blocks (list[bytes]): Blocks from `render`
+        offset (int, optional): File offset of the first block. Defaults to 0.
+
+    Returns:
+        list[dict]: Offset, length and sha1 of each block
+    """
+    described = []
+    for block in blocks:
+        described.append(
+            {
+                "offset": offset,
+                "length": len(block),
+                "sha1": hashlib.sha1(block).hexdigest(),
+            }
+        )
+        offset += len(block)
+    return described
+
+
+def _entry(rows: int, blocks: list[dict]) -> dict:
+    return {
+        "rows": rows,
+        "size": blocks[-1]["offset"] + blocks[-1]["length"],
+        "block_rows": constants.SYNC_BLOCK_ROWS,
+        "blocks": blocks,
+    }
+
+
+def _relative(directory: str, form: str, event_id: str) -> str:
+    return os.path.relpath(storage.totals_path(directory, form, event_id), directory)
+
+
+def update(
+    files: dict[str, dict],
+    directory: str,
+    form: str,
+    event_id: str,
+    frame: pandas.DataFrame,
+) -> None:
+    """Describe rows appended to a totals file since its entry was made
+
+    Args:
+        files (dict[str, dict]): Manifest entries, updated in place
+        directory (str): Disk mountpoint
+        form (str): Form name
+        event_id (str): Event code
+        frame (pandas.DataFrame): Full frame the file now holds
+    """
+    relative = _relative(directory, form, event_id)
+    entry = files.get(relative)
+    if (
+        not entry
+        or entry["block_rows"] != constants.SYNC_BLOCK_ROWS
+        or entry["rows"] > len(frame)
+    ):
+        files[relative] = _entry(len(frame), describe(render(frame)))
+        return
+
+    # only the last, partly filled, block and anything after it can change
+    start = 1 + entry["rows"] // constants.SYNC_BLOCK_ROWS
+    kept = entry["blocks"][:start]
+    offset = kept[-1]["offset"] + kept[-1]["length"]
+    files[relative] = _entry(len(frame), kept + describe(render(frame, start), offset))
+
+
+def _matches(file, block: dict) -> bool:
+    file.seek(block["offset"])
+    data = file.read(block["length"])
+    return hashlib.sha1(data).hexdigest() == block["sha1"]
+
+
+def sync(
+    writer: storage.TotalsWriter,
+    files: dict[str, dict],
+    directory: str,
+    form: str,
+    event_id: str,
+    frame: pandas.DataFrame,
+) -> SyncResult:
+    """Bring a totals file on a disk up to date with a frame
+
+    Blocks the manifest shows are already on the disk are kept, blocks that
+    changed in place are overwritten and the file is cut and rewritten from the
+    first block whose length changed. Only the frame's rows from the last full
+    block in the manifest on are rendered. A file without a usable manifest
+    entry, whose kept blocks don't match it, or that needs more than half
+    rewritten, is compacted by `writer` instead.
+
+    Args:
+        writer (storage.TotalsWriter): Writer of the disk, used for full
+                                       rewrites and told about the new file
+        files (dict[str, dict]): Manifest entries, updated in place
+        directory (str): Disk mountpoint
+        form (str): Form name
+        event_id (str): Event code
+        frame (pandas.DataFrame): Full frame for the form
+
+    Raises:
+        OSError: If the disk can't be written or the written bytes don't verify
+
+    Returns:
+        SyncResult: What had to be written
+    """
+    path = storage.totals_path(directory, form, event_id)
+    relative = _relative(directory, form, event_id)
+    old = files.get(relative)
+    usable = old and old["block_rows"] == constants.SYNC_BLOCK_ROWS
+
+    first = 0  # first block rendered and compared
+    if usable and old["rows"] <= len(frame):
+        # rows are only appended, so only the last, partly filled, block and
+        # anything after it can change. The full block before it is compared
+        # too, in case the disk holds some other station's rows.
+        first = old["rows"] // constants.SYNC_BLOCK_ROWS
+    blocks = render(frame, first)
+    if first:
+        new = old["blocks"][:first] + describe(blocks, old["blocks"][first]["offset"])
+        if new[first]["sha1"] != old["blocks"][first]["sha1"]:
+            first = 0
+            blocks = render(frame)
+    if not first:
+        new = describe(blocks)
+
+    writes: list[int] = []  # indices of blocks to write
+    cut = None  # block to truncate the file at
+    if usable:
+        for index in range(first, len(new)):
+            block = new[index]
+            if index >= len(old["blocks"]):
+                cut = index
+                break
+            previous = old["blocks"][index]
+            if previous["sha1"] == block["sha1"]:
+                continue
+            if previous["length"] != block["length"]:
+                cut = index
+                break
+            writes.append(index)
+        if cut is None and len(new) < len(old["blocks"]):
+            cut = len(new)
+    else:
+        cut = 0
+
+    writes += list(range(cut, len(new))) if cut is not None else []
+    written = sum(new[index]["length"] for index in writes)
+    full = cut == 0 or written * 2 > new[-1]["offset"] + new[-1]["length"]
+    try:
+        if not full:
+            full = not _write_blocks(
+                path, blocks, first, new, writes, cut, old, writer.durability
+            )
+    except FileNotFoundError:
+        full = True
+
+    if full:
+        writer.compact(directory, form, event_id, frame)
+        writes = list(range(len(new)))
+        written = sum(block["length"] for block in new)
+    else:
+        writer.mark_synced(directory, form, event_id, len(frame))
+
+    files[relative] = _entry(len(frame), new)
+    return SyncResult(len(writes), written, full)
+
+
+def _write_blocks(
+    path: str,
+    blocks: list[bytes],
+    first: int,
+    new: list[dict],
+    writes: list[int],
+    cut: int | None,
+    old: dict,
+    durability: storage.Durability,
+) -> bool:
+    # blocks[0] is block `first` of the file
+    with open(path, "r+b") as file:
+        size = file.seek(0, os.SEEK_END)
+        kept = [
+            block
+            for index, block in enumerate(old["blocks"])
+            if index not in writes and index < (len(new) if cut is None else cut)
+        ]
+        # the disk may have been written by another station since
+        if size < old["size"] or not all(_matches(file, block) for block in kept):
+            logging.info("%s differs from its manifest, rewriting it", path)
+            return False
+
+        for index in writes:
+            file.seek(new[index]["offset"])
+            file.write(blocks[index - first])
+        file.truncate(new[-1]["offset"] + new[-1]["length"])
+        file.flush()
+        if durability != storage.Durability.BUFFERED:
+            os.fsync(file.fileno())
+
+        if not all(_matches(file, new[index]) for index in writes):
+            raise OSError(f"{path} did not verify after sync")
+    return True
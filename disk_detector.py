@@ -4,13 +4,25 @@ Wrapper for psutil disk partitions
 
 import os
 import json
+import time
+import select
+import logging
+import threading
 
 from dataclasses import dataclass
 
 import psutil
 
+import constants
 import utils
 
+MOUNTINFO = "/proc/self/mountinfo"
+OPTS_FILE = "scout_disk_opts.json"
+
+# (device, mountpoint) -> (disk and opts file signature, predicate result)
+_identities: dict[tuple[str, str], tuple[tuple, tuple[bool, str, str]]] = {}
+_identities_lock = threading.Lock()
+
 
 @dataclass
 class Disk:
@@ -27,48 +39,225 @@ class Disk:
     capacity: int = 0
 
 
-class DiskDetector:  # pylint: disable=too-few-public-methods
+class MountWatcher:
+    """
+    Watch the Linux mount table, the kernel flags mountinfo with POLLPRI whenever
+    a filesystem is mounted or unmounted
+    """
+
+    def __init__(self, path: str = MOUNTINFO) -> None:
+        self._fd = os.open(path, os.O_RDONLY)
+        self._poll = select.poll()
+        self._poll.register(self._fd, select.POLLPRI | select.POLLERR)
+
+    def wait(self, timeout: float | None = 0) -> bool:
+        """Check for a mount table change
+
+        Args:
+            timeout (float | None, optional): Seconds to wait, None waits until
+                                              a change. Defaults to 0.
+
+        Returns:
+            bool: Whether the mount table changed since the last check
+        """
+        milliseconds = None if timeout is None else int(timeout * 1000)
+        return bool(self._poll.poll(milliseconds))
+
+    def close(self) -> None:
+        """
+        Stop watching
+        """
+        os.close(self._fd)
+
+
+class DiskDetector:
     """
     Detect disk partitions
+
+    On Linux mount table changes are watched through /proc/self/mountinfo, on
+    other platforms every check reports a change and disks are polled.
+
+    Capacity queries run on their own threads so a hung mount (stale network
+    share, failing USB stick) can't block a scan for longer than `timeout`. A
+    mount that times out is left out of results and quarantined, it is retried
+    after `backoff` seconds, doubling up to `max_backoff`.
     """
 
-    @staticmethod
-    def get_disks() -> list[Disk]:
+    def __init__(
+        self,
+        timeout: float = constants.DISK_PROBE_TIMEOUT,
+        backoff: float = constants.DISK_QUARANTINE_BACKOFF,
+        max_backoff: float = constants.DISK_QUARANTINE_MAX,
+    ) -> None:
+        self.timeout = timeout
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+
+        self._scanned = False
+        # mountpoint -> (monotonic retry time, current backoff)
+        self._quarantine: dict[str, tuple[float, float]] = {}
+        self._probes: dict[str, threading.Thread] = {}  # may outlive a scan
+        self._capacities: dict[str, int | OSError] = {}
+        try:
+            self._watcher: MountWatcher | None = MountWatcher()
+        except (OSError, AttributeError):  # no procfs, or no select.poll
+            logging.info("Mount table can't be watched, polling disks")
+            self._watcher = None
+
+    def changed(self, timeout: float | None = 0) -> bool:
+        """Check if disks may have changed since the last `get_disks`
+
+        Args:
+            timeout (float | None, optional): Seconds to wait for a change.
+                                              Defaults to 0.
+
+        Returns:
+            bool: Whether disks should be rescanned
+        """
+        if self._watcher is None or not self._scanned:
+            return True
+        now = time.monotonic()
+        if any(retry_at <= now for retry_at, _ in self._quarantine.values()):
+            return True
+        return self._watcher.wait(timeout)
+
+    def quarantined(self) -> list[str]:
+        """
+        Mountpoints left out of scans because they stopped responding
+        """
+        return list(self._quarantine)
+
+    def get_disks(self) -> list[Disk]:
         """
         Get disk partitiond
 
         Returns:
             list[Disk]: List of currently available disk partitions
         """
+        self._scanned = True
+        partitions = psutil.disk_partitions()
+        capacities = self._probe_capacities(
+            [partition.mountpoint for partition in partitions]
+        )
+
         disks = []
-        for disk in psutil.disk_partitions():
-            disks.append(
-                Disk(
-                    disk.device,
-                    disk.mountpoint,
-                    disk.fstype,
-                    disk.opts,
-                    disk.maxfile,
-                    disk.maxpath,
-                    psutil.disk_usage(disk.mountpoint).total,
+        for disk in partitions:
+            if disk.mountpoint in capacities:
+                disks.append(
+                    Disk(
+                        disk.device,
+                        disk.mountpoint,
+                        disk.fstype,
+                        disk.opts,
+                        disk.maxfile,
+                        disk.maxpath,
+                        capacities[disk.mountpoint],
+                    )
                 )
-            )
+        forget_identities(disks)
         return disks
 
+    def _probe_capacities(self, mountpoints: list[str]) -> dict[str, int]:
+        now = time.monotonic()
+        probing = [
+            mountpoint
+            for mountpoint in mountpoints
+            if self._quarantine.get(mountpoint, (0, 0))[0] <= now
+        ]
+        for mountpoint in probing:
+            if mountpoint not in self._probes:  # else still stuck from a scan ago
+                self._probes[mountpoint] = threading.Thread(
+                    target=self._probe,
+                    args=(mountpoint,),
+                    name=f"disk-probe {mountpoint}",
+                    daemon=True,
+                )
+                self._probes[mountpoint].start()
+
+        deadline = now + self.timeout
+        capacities = {}
+        for mountpoint in probing:
+            probe = self._probes[mountpoint]
+            probe.join(max(deadline - time.monotonic(), 0))
+            if probe.is_alive():
+                self._hold(mountpoint, "did not respond")
+                continue
+
+            del self._probes[mountpoint]
+            capacity = self._capacities.pop(mountpoint)
+            if isinstance(capacity, OSError):
+                self._hold(mountpoint, str(capacity))
+                continue
+            if self._quarantine.pop(mountpoint, None):
+                logging.info("Mount %s is responding again", mountpoint)
+            capacities[mountpoint] = capacity
+
+        for mountpoint in set(self._quarantine) - set(mountpoints):
+            del self._quarantine[mountpoint]  # unmounted
+        return capacities
+
+    def _probe(self, mountpoint: str) -> None:
+        try:
+            self._capacities[mountpoint] = psutil.disk_usage(mountpoint).total
+        except OSError as error:
+            self._capacities[mountpoint] = error
+
+    def _hold(self, mountpoint: str, reason: str) -> None:
+        backoff = self._quarantine.get(mountpoint, (0, 0))[1]
+        backoff = min(backoff * 2 or self.backoff, self.max_backoff)
+        self._quarantine[mountpoint] = (time.monotonic() + backoff, backoff)
+        logging.warning("Mount %s %s, retrying in %.0f s", mountpoint, reason, backoff)
+
+
+def forget_identities(disks: list[Disk]) -> None:
+    """Drop cached identifications of disks that are no longer mounted
+
+    Args:
+        disks (list[Disk]): Currently mounted disks
+    """
+    mounted = {(disk.device, disk.mountpoint) for disk in disks}
+    with _identities_lock:
+        for key in [key for key in _identities if key not in mounted]:
+            del _identities[key]
+
+
+def _opts_signature(path: str) -> tuple[int, int, int] | None:
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
 
 def scouting_disk_predicate(disk: Disk) -> tuple[bool, str, str]:
     """Disk detection predicate
 
+    The result is cached until the disk or its scout_disk_opts.json changes, so
+    the opts file is only read once per disk.
+
     Args:
         disk (disk_detector.Disk): Disk to attempt search
 
     Returns:
         tuple[bool, str, str]: Output from predicate (Visible, Name, Icon)
     """
-    if os.path.isfile(os.path.join(disk.mountpoint, "scout_disk_opts.json")):
-        with open(
-            os.path.join(disk.mountpoint, "scout_disk_opts.json"), "r", encoding="utf-8"
-        ) as file:
+    path = os.path.join(disk.mountpoint, OPTS_FILE)
+    signature = (disk.fstype, disk.capacity, _opts_signature(path))
+
+    with _identities_lock:
+        cached = _identities.get((disk.device, disk.mountpoint))
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    result = _identify(disk, path if signature[2] else None)
+    with _identities_lock:
+        _identities[(disk.device, disk.mountpoint)] = (signature, result)
+    return result
+
+
+def _identify(disk: Disk, path: str | None) -> tuple[bool, str, str]:
+    if path:
+        with open(path, "r", encoding="utf-8") as file:
             opts = json.load(file)
     else:
         opts = {}
@@ -85,7 +274,7 @@ def scouting_disk_predicate(disk: Disk) -> tuple[bool, str, str]:
             return (
                 True,
                 f"ID: ?? {disk.mountpoint} fs:{disk.fstype} "
-                "cap:{utils.format_bytes(disk.capacity)}",
+                f"cap:{utils.format_bytes(disk.capacity)}",
                 "0",
             )
 
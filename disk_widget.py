@@ -1,5 +1,5 @@
 """
-PyQt6 widget for automatic disk partition detection and identification
+PySide6 widget for automatic disk partition detection and identification
 """
 
 from __future__ import annotations
@@ -8,8 +8,7 @@ import sys
 import typing
 import logging
 
-from PyQt6.QtGui import QIcon
-from PyQt6.QtWidgets import (
+from PySide6.QtWidgets import (
     QPushButton,
     QVBoxLayout,
     QLabel,
@@ -17,10 +16,12 @@ from PyQt6.QtWidgets import (
     QWidget,
     QComboBox,
 )
-from PyQt6.QtCore import QTimer, pyqtSignal, Qt, QSize
+from PySide6.QtCore import QTimer, Signal, Qt, QSize, QObject, QThread
 
+import constants
 import disk_detector
 from disk_detector import Disk
+import icon_cache
 import utils
 
 ICON_ID_PAIRS = {"1": "icons/id-one.svg", "2": "icons/id-two.svg"}
@@ -45,20 +46,90 @@ def default_disk_predicate(disk: disk_detector.Disk) -> tuple[bool, str, str]:
     return False, "", "0"
 
 
+class DiskScanner(QObject):
+    """
+    Enumerates and identifies disks on its own thread, so slow or hung mounts
+    never block the GUI
+    """
+
+    scanned = Signal(object)  # list[tuple[Disk, tuple[bool, str, str]]]
+
+    def __init__(
+        self,
+        detector: disk_detector.DiskDetector,
+        predicate: typing.Callable[[disk_detector.Disk], tuple[bool, str, str]],
+        interval: int = constants.DISK_SCAN_INTERVAL,
+    ) -> None:
+        super().__init__()
+        self.detector = detector
+        self.predicate = predicate
+        self.interval = interval
+        self._timer: QTimer | None = None
+
+    def start(self) -> None:
+        """
+        Start checking for mount changes, call on the scanner's thread
+        """
+        self._timer = QTimer(self)
+        self._timer.setInterval(self.interval)
+        self._timer.timeout.connect(self.check)
+        self._timer.start()
+        self.check()
+
+    def set_enabled(self, enabled: bool) -> None:
+        """Set whether mount changes are checked for
+
+        Args:
+            enabled (bool): Automatic detection enable
+        """
+        if enabled:
+            self._timer.start()
+        else:
+            self._timer.stop()
+
+    def check(self) -> None:
+        """
+        Scan if the mount table changed
+        """
+        if self.detector.changed():
+            self.scan()
+
+    def scan(self) -> None:
+        """
+        Enumerate and identify disks, then publish them through `scanned`
+        """
+        results = []
+        for disk in self.detector.get_disks():
+            try:
+                results.append((disk, self.predicate(disk)))
+            except (OSError, ValueError) as error:  # e.g. a corrupt opts file
+                logging.warning("Can't identify %s: %s", disk.mountpoint, error)
+        self.scanned.emit(results)
+
+
 class DiskMgmtWidget(QWidget):
     """
-    PyQt6 Widget for automatically detecting and identifying disk partitions
+    PySide6 Widget for automatically detecting and identifying disk partitions
     """
 
-    diskSelected = pyqtSignal(
+    diskSelected = Signal(
         object, name="Disk Selected"
     )  # workaround for Qt not liking NoneType
-    diskFocused = pyqtSignal(object, name="Disk Focus in Dropdown")
+    diskFocused = Signal(object, name="Disk Focus in Dropdown")
+    disksChanged = Signal(object, name="Visible Disks Changed")
+
+    _scanRequested = Signal()
+    _scanEnabled = Signal(bool)
 
     def __init__(
-        self, detector=disk_detector.DiskDetector(), predicate=default_disk_predicate
+        self,
+        detector: disk_detector.DiskDetector | None = None,
+        predicate=default_disk_predicate,
     ):
         super().__init__()
+        if detector is None:
+            # each widget gets its own, the detector keeps per-mount state
+            detector = disk_detector.DiskDetector()
 
         self._main_layout = QVBoxLayout()
         self._main_layout.setContentsMargins(0, 0, 0, 0)
@@ -66,19 +137,24 @@ class DiskMgmtWidget(QWidget):
 
         self.blocked_mounts = ["C:\\", "/"]
 
-        self._dd = detector
         self._disks: list[disk_detector.Disk] = []
         self._filtered_disks: list[disk_detector.Disk] = []
+        # dropdown items in order: ((device, mountpoint), name, icon path)
+        self._entries: list[tuple[tuple[str, str], str, str]] = []
         self._last_focused_disk: disk_detector.Disk | None = None
 
         self._predicate: typing.Callable[[disk_detector.Disk], tuple[bool, str]] = (
             predicate
         )
 
-        self._timer = QTimer(self)
-        self._timer.setInterval(1000)
-        self._timer.timeout.connect(self.update_disks)
-        self._timer.start()
+        self._scanner = DiskScanner(detector, predicate)
+        self._scanner_thread = QThread()
+        self._scanner.moveToThread(self._scanner_thread)
+        self._scanner_thread.started.connect(self._scanner.start)
+        self._scanner.scanned.connect(self._on_scanned)
+        self._scanRequested.connect(self._scanner.scan)
+        self._scanEnabled.connect(self._scanner.set_enabled)
+        self._scanner_thread.start()
 
         self._title = QLabel("Disks")
         self._main_layout.addWidget(self._title)
@@ -86,7 +162,7 @@ class DiskMgmtWidget(QWidget):
         self._disks_dropdown = QComboBox()
         self._disks_dropdown.setIconSize(QSize(48, 48))
         self._disks_dropdown.setObjectName("big_dropdown")
-        self._disks_dropdown.currentTextChanged.connect(self._send_focused_disk)
+        self._disks_dropdown.currentIndexChanged.connect(self._send_focused_disk)
         self._main_layout.addWidget(self._disks_dropdown)
 
         self._refresh = QPushButton("Refresh")
@@ -105,36 +181,78 @@ class DiskMgmtWidget(QWidget):
 
     def update_disks(self) -> None:
         """
-        Update list of partitions
+        Rescan partitions in the background, the list updates when it's done
         """
 
-        current_index = self._disks_dropdown.currentIndex()
-        self._disks_dropdown.clear()
+        self._scanRequested.emit()
 
-        self._disks = self._dd.get_disks()
-        filtered_disks = []
-        drop_items = []
-
-        if self._disks:
-            for disk in self._disks:
-                if self._predicate(disk)[0]:
-                    if self._predicate(disk)[2] in ICON_ID_PAIRS:
-                        icon = ICON_ID_PAIRS[self._predicate(disk)[2]]
-                    else:
-                        icon = "icons/drive.svg"
-                    filtered_disks.append(disk)
-                    drop_items.append((QIcon(icon), self._predicate(disk)[1]))
+    def stop(self) -> None:
+        """
+        Stop background detection, call before the application exits
+        """
 
-        self._select.setEnabled(bool(filtered_disks))
-        if not filtered_disks:
-            self._send_focused_disk()
+        self._scanEnabled.emit(False)  # the timer has to stop on its own thread
+        self._scanner_thread.quit()
+        self._scanner_thread.wait()
+
+    def _on_scanned(
+        self, results: list[tuple[disk_detector.Disk, tuple[bool, str, str]]]
+    ) -> None:
+        self._disks = [disk for disk, _ in results]
+        filtered_disks = []
+        entries = []
+
+        for disk, (visible, name, icon_id) in results:
+            if visible:
+                filtered_disks.append(disk)
+                entries.append(
+                    (
+                        (disk.device, disk.mountpoint),
+                        name,
+                        ICON_ID_PAIRS.get(icon_id, "icons/drive.svg"),
+                    )
+                )
 
         self._filtered_disks = filtered_disks
-        for item in drop_items:
-            self._disks_dropdown.addItem(item[0], item[1])
-        self._disks_dropdown.setCurrentIndex(
-            max(current_index, 0)
-        )  # always try to keep one selected
+        changed = entries != self._entries
+        if changed:
+            self._update_dropdown(entries)
+        self._select.setEnabled(bool(filtered_disks))
+        self._send_focused_disk()
+        if changed:
+            self.disksChanged.emit(filtered_disks)
+
+    def _update_dropdown(self, entries: list[tuple[tuple[str, str], str, str]]):
+        # items are matched by disk identity, so the selection follows its disk
+        previous = {key: (name, icon) for key, name, icon in self._entries}
+        keys = [key for key, _, _ in self._entries]
+        new_keys = {key for key, _, _ in entries}
+
+        blocked = self._disks_dropdown.blockSignals(True)
+        for index in reversed(range(len(keys))):
+            if keys[index] not in new_keys:
+                self._disks_dropdown.removeItem(index)
+                del keys[index]
+
+        for index, (key, name, icon) in enumerate(entries):
+            if index < len(keys) and keys[index] == key:
+                if previous[key][0] != name:
+                    self._disks_dropdown.setItemText(index, name)
+                if previous[key][1] != icon:
+                    self._disks_dropdown.setItemIcon(index, icon_cache.file_icon(icon))
+                continue
+
+            if key in keys:  # moved in the mount table
+                self._disks_dropdown.removeItem(keys.index(key))
+                keys.remove(key)
+            self._disks_dropdown.insertItem(index, icon_cache.file_icon(icon), name)
+            keys.insert(index, key)
+
+        if self._disks_dropdown.currentIndex() < 0 and entries:
+            self._disks_dropdown.setCurrentIndex(0)
+        self._disks_dropdown.blockSignals(blocked)
+
+        self._entries = entries
 
     def set_timer_enabled(self, enabled: bool) -> None:
         """
@@ -144,10 +262,7 @@ class DiskMgmtWidget(QWidget):
             enabled (bool): Automatic detection timer enable
         """
 
-        if enabled:
-            self._timer.start()
-        else:
-            self._timer.stop()
+        self._scanEnabled.emit(enabled)
 
     def set_disk_predicate(
         self, predicate: typing.Callable[[disk_detector.Disk], tuple[bool, str, str]]
@@ -160,6 +275,8 @@ class DiskMgmtWidget(QWidget):
             Callable function to return disk identification and visibility
         """
         self._predicate = predicate
+        self._scanner.predicate = predicate
+        self.update_disks()
 
     def get_raw_disks(self) -> list[disk_detector.Disk]:
         """
@@ -204,21 +321,10 @@ class DiskMgmtWidget(QWidget):
         self._select.setVisible(visible)
 
     def _send_focused_disk(self) -> None:
-        if not self._filtered_disks:
-            self.diskFocused.emit(None)
-            self._last_focused_disk = None
-            return
-
-        if (
-            self._filtered_disks[self._disks_dropdown.currentIndex()]
-            != self._last_focused_disk
-        ):
-            self.diskFocused.emit(
-                self._filtered_disks[self._disks_dropdown.currentIndex()]
-            )
-            self._last_focused_disk = self._filtered_disks[
-                self._disks_dropdown.currentIndex()
-            ]
+        disk = self.get_selected_disk()
+        if disk != self._last_focused_disk:
+            self.diskFocused.emit(disk)
+            self._last_focused_disk = disk
 
 
 if __name__ == "__main__":
@@ -226,5 +332,6 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     widget = DiskMgmtWidget()
     widget.diskSelected.connect(print)  # print disk on selection
+    app.aboutToQuit.connect(widget.stop)
     widget.show()
     sys.exit(app.exec())
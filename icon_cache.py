@@ -0,0 +1,80 @@
+"""
+Process-wide cache for qtawesome and file icons
+"""
+
+import logging
+
+from PySide6.QtGui import QIcon
+import qtawesome
+
+_icons: dict[tuple, QIcon] = {}
+_hits = 0
+_misses = 0
+
+
+def icon(name: str, color: str | None = None, **options) -> QIcon:
+    """Get a cached qtawesome icon
+
+    Args:
+        name (str): qtawesome icon name (e.g. "mdi6.null")
+        color (str | None, optional): Icon color. Defaults to None.
+        **options: Other qtawesome options (e.g. animation)
+
+    Returns:
+        QIcon: Shared icon instance
+    """
+    key = ("qta", name, color, tuple(sorted(options.items())))
+    cached = _lookup(key)
+    if cached is None:
+        if color is not None:
+            options["color"] = color
+        cached = _store(key, qtawesome.icon(name, **options))
+    return cached
+
+
+def file_icon(path: str) -> QIcon:
+    """Get a cached icon loaded from a file
+
+    Args:
+        path (str): Path to image file
+
+    Returns:
+        QIcon: Shared icon instance
+    """
+    key = ("file", path)
+    cached = _lookup(key)
+    if cached is None:
+        cached = _store(key, QIcon(path))
+    return cached
+
+
+def stats() -> dict[str, int]:
+    """Get cache statistics
+
+    Returns:
+        dict[str, int]: Number of cached icons, hits and misses
+    """
+    return {"icons": len(_icons), "hits": _hits, "misses": _misses}
+
+
+def clear() -> None:
+    """
+    Drop all cached icons (e.g. after a theme change)
+    """
+    _icons.clear()
+    logging.debug("Icon cache cleared")
+
+
+def _lookup(key: tuple) -> QIcon | None:
+    global _hits, _misses  # pylint: disable=global-statement
+    cached = _icons.get(key)
+    if cached is None:
+        _misses += 1
+    else:
+        _hits += 1
+    return cached
+
+
+def _store(key: tuple, value: QIcon) -> QIcon:
+    _icons[key] = value
+    return value
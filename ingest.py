@@ -0,0 +1,648 @@
+"""
+Qt-free scan ingest engine
+
+Parses, validates, dedupes and persists scans without a GUI. The transfer app
+is a thin client of this module, and it can be run on its own, e.g.
+
+    python ingest.py --directory transfer --event 2024mndu scans.txt
+    python ingest.py --directory transfer --event 2024mndu /dev/ttyACM0
+    python ingest.py --directory transfer --event 2024mndu --team 6369
+"""
+
+import os
+import sys
+import collections
+import stat
+import enum
+import json
+import typing
+import logging
+import argparse
+import threading
+from dataclasses import dataclass, field
+
+import pandas
+
+import batch_import
+import constants
+import decoder
+import key_index
+import mirror
+import schema
+import serial_framer
+import snapshot
+import sqlite_store
+import storage
+
+
+class IngestStatus(enum.Enum):
+    """Outcome of ingesting one payload"""
+
+    ADDED = 0
+    DUPLICATE = 1
+    REJECTED = 2
+
+
+@dataclass
+class IngestResult:
+    """
+    Result of `IngestEngine.ingest`
+    """
+
+    status: IngestStatus
+    payload: str
+    form: str = ""
+    error: constants.DataError | None = None
+    field_errors: list[decoder.FieldError] = field(default_factory=list)
+    team: str | None = None
+    label: typing.Any = None  # index label of the added row
+    values: list = field(default_factory=list)  # typed values of the added row
+
+
+class Backend(enum.Enum):
+    """Where an event's scans are kept"""
+
+    CSV = "csv"  # totals files only
+    SQLITE = "sqlite"  # SQLite database, totals files are exported from it
+
+
+def new_writer(
+    durability: storage.Durability = storage.Durability.BUFFERED,
+) -> storage.TotalsWriter:
+    """Create a totals writer with the app's compaction and group commit settings
+
+    Args:
+        durability (storage.Durability, optional): Durability policy.
+                                                   Defaults to BUFFERED.
+
+    Returns:
+        storage.TotalsWriter: Writer
+    """
+    return storage.TotalsWriter(
+        constants.TOTALS_COMPACT_INTERVAL,
+        durability,
+        constants.DURABILITY_GROUP_SIZE,
+        constants.DURABILITY_GROUP_INTERVAL,
+    )
+
+
+class EventStore:
+    """
+    Data, dedupe index and totals files for one event in one transfer directory
+
+    Rows are appended to the transfer directory as part of ingest, and copied
+    to every mirror directory (e.g. a scouting disk) in the background by a
+    `mirror.DiskMirror`, so a slow or failing disk never stalls ingest.
+
+    With the SQLite backend, rows are committed to the event's database first
+    and the totals files are an export of it.
+    """
+
+    def __init__(
+        self,
+        directory: str = "",
+        event_id: str = "",
+        writer: storage.TotalsWriter | None = None,
+        disk_mirror: mirror.DiskMirror | None = None,
+        backend: Backend = Backend.CSV,
+    ) -> None:
+        self.directory = directory
+        self.event_id = event_id
+        self.backend = backend
+        self.database: sqlite_store.EventDatabase | None = None
+        self.mirrors: list[str] = []
+        self.writer = writer or new_writer()
+        self.disk_mirror = disk_mirror or mirror.DiskMirror(new_writer())
+        self.index = key_index.KeyIndex()
+        self.data_frames = {form: schema.empty_frame(form) for form in schema.HEADERS}
+        self._buffers: dict[str, schema.FrameBuffer] = {}  # appends to data_frames
+        self.lock = threading.RLock()
+        self._snapshot_rows: dict[str, int | None] = {}  # rows in each snapshot
+        # (directory, event_id, form) -> (totals file mtime and size, frame,
+        # snapshot rows), so switching back to an unchanged event skips parsing
+        self._cache: collections.OrderedDict[tuple[str, str, str], tuple] = (
+            collections.OrderedDict()
+        )
+
+    def load(self, directory: str, event_id: str) -> None:
+        """Load an event's totals files, missing files give empty forms
+
+        Args:
+            directory (str): Transfer directory
+            event_id (str): Event code
+        """
+        with self.lock:
+            self.snapshot()
+            self.directory = directory
+            self.event_id = event_id
+            self.writer.reset()
+            self._snapshot_rows = {}
+            if self.database:
+                self.database.close()
+                self.database = None
+
+            if self.backend == Backend.SQLITE and event_id and os.path.isdir(directory):
+                self.database = sqlite_store.EventDatabase(
+                    sqlite_store.database_path(directory, event_id),
+                    self.writer.durability,
+                )
+            stored = self.database is not None and any(
+                self.database.count(form) for form in schema.HEADERS
+            )
+
+            for form in schema.HEADERS:
+                path = storage.totals_path(directory, form, event_id)
+                if os.path.exists(path):
+                    storage.recover(path)
+                if stored:
+                    self._load_stored(form, path)
+                elif os.path.exists(path) and os.path.getsize(path):
+                    self.data_frames[form] = self._read(form, path)
+                    self.writer.mark_synced(
+                        directory, form, event_id, len(self.data_frames[form])
+                    )
+                else:
+                    self.data_frames[form] = schema.empty_frame(form)
+
+            if self.database is not None and not stored:
+                sqlite_store.import_frames(self.database, self.data_frames)
+
+            for form in schema.HEADERS:
+                self._remember(form)
+            self.index.rebuild(self.data_frames)
+            for mirror_dir in self.mirrors:
+                self._mirror_all(mirror_dir)
+
+    def _read(self, form: str, path: str) -> pandas.DataFrame:
+        key = self._cache_key(form)
+        cached = self._cache.get(key)
+        if cached and cached[0] == _file_signature(path):
+            self._cache.move_to_end(key)
+            self._snapshot_rows[form] = cached[2]
+            return cached[1]
+
+        frame = snapshot.read(self.directory, form, self.event_id)
+        if frame is not None:
+            self._snapshot_rows[form] = None  # may have a CSV tail, refresh later
+            return frame
+
+        frame = schema.read_csv(path, form)
+        if snapshot.write(self.directory, form, self.event_id, frame):
+            self._snapshot_rows[form] = len(frame)
+        return frame
+
+    def _cache_key(self, form: str) -> tuple[str, str, str]:
+        return (os.path.abspath(self.directory), self.event_id, form)
+
+    def _remember(self, form: str) -> None:
+        path = storage.totals_path(self.directory, form, self.event_id)
+        if not os.path.exists(path):
+            return
+
+        key = self._cache_key(form)
+        self._cache[key] = (
+            _file_signature(path),
+            self.data_frames[form],
+            self._snapshot_rows.get(form),
+        )
+        self._cache.move_to_end(key)
+        while len(self._cache) > constants.LOAD_CACHE_SIZE:
+            self._cache.popitem(last=False)
+
+    def snapshot(self) -> None:
+        """
+        Refresh the Arrow snapshot of every form that changed since the last one
+        """
+        with self.lock:
+            if not snapshot.available() or not os.path.isdir(self.directory):
+                return
+            for form in self.data_frames:
+                self._snapshot(form)
+
+    def _snapshot(self, form: str) -> None:
+        frame = self.data_frames[form]
+        path = storage.totals_path(self.directory, form, self.event_id)
+        if self._snapshot_rows.get(form) == len(frame) or not os.path.exists(path):
+            return
+        if snapshot.write(self.directory, form, self.event_id, frame):
+            self._snapshot_rows[form] = len(frame)
+            self._remember(form)
+
+    def _load_stored(self, form: str, path: str) -> None:
+        # the database is the source, the CSV export is only parsed if it differs
+        stored = self.database.count(form)
+        exported = storage.count_rows(path) if os.path.exists(path) else 0
+        if exported > stored:
+            # scans added while the CSV backend was in use
+            frame = self._read(form, path)
+            sqlite_store.insert_frame(self.database, form, frame.iloc[stored:])
+            self.data_frames[form] = frame
+            self.writer.mark_synced(self.directory, form, self.event_id, len(frame))
+            return
+
+        self.data_frames[form] = (
+            self.database.read(form) if stored else schema.empty_frame(form)
+        )
+        if exported == stored:
+            self.writer.mark_synced(self.directory, form, self.event_id, stored)
+        else:
+            # export fell behind the database, e.g. a crash between the two
+            self.persist(form, compact=True)
+
+    def set_backend(self, backend: Backend) -> None:
+        """Switch storage backend, takes effect on the next `load`
+
+        Args:
+            backend (Backend): Storage backend
+        """
+        with self.lock:
+            self.backend = backend
+
+    def set_mirrors(self, mirrors: list[str]) -> None:
+        """Set the directories totals files are mirrored to
+
+        Args:
+            mirrors (list[str]): Mirror directories (e.g. disk mountpoints)
+        """
+        with self.lock:
+            for mirror_dir in set(self.mirrors) - set(mirrors):
+                self.disk_mirror.discard(mirror_dir)
+            added = set(mirrors) - set(self.mirrors)
+            self.mirrors = list(mirrors)
+            for mirror_dir in added:
+                # may have been written elsewhere since we last saw it
+                self.disk_mirror.discard(mirror_dir)
+                self._mirror_all(mirror_dir)
+
+    def set_durability(self, durability: storage.Durability) -> None:
+        """Set when totals files are fsynced, for the transfer directory and mirrors
+
+        Args:
+            durability (storage.Durability): Durability policy
+        """
+        with self.lock:
+            self.writer.set_durability(durability)
+            self.disk_mirror.set_durability(durability)
+            if self.database:
+                self.database.set_durability(durability)
+
+    def add(self, form: str, rows: list[list], keys: list) -> None:
+        """Append decoded rows to a form and persist them
+
+        Args:
+            form (str): Form name
+            rows (list[list]): Decoder output, one value per header column
+            keys (list): Dedupe keys of the rows
+
+        Raises:
+            schema.SchemaError: A number is out of its column's range, nothing
+                                is added then
+        """
+        with self.lock:
+            buffer = self._buffers.get(form)
+            if buffer is None or buffer.frame is not self.data_frames[form]:
+                # replaced since, e.g. by a load or a batch import
+                buffer = schema.FrameBuffer(form, self.data_frames[form])
+                self._buffers[form] = buffer
+            start = len(buffer)
+            frame = buffer.append(rows)
+            if self.database:
+                try:
+                    sqlite_store.insert_frame(self.database, form, frame.iloc[start:])
+                except Exception:
+                    buffer.truncate(start)
+                    raise
+            self.data_frames[form] = frame
+            for key in keys:
+                self.index.add(form, key)
+            self.persist(form, compact=len(rows) > 1)
+
+    def contains(self, form: str, key: tuple[int, ...] | None) -> bool:
+        """Check if a scan with a dedupe key is stored
+
+        Args:
+            form (str): Form name
+            key (tuple[int, ...] | None): Key from `key_index.KeyIndex.key`
+
+        Returns:
+            bool: Whether the key is present
+        """
+        with self.lock:
+            if self.database:
+                return self.database.contains(form, key)
+            return self.index.contains(form, key)
+
+    def team(self, form: str, team) -> pandas.DataFrame:
+        """Get every scan of one team
+
+        Args:
+            form (str): Form name
+            team (Any): Team number, e.g. 6369 or "frc6369"
+
+        Returns:
+            pandas.DataFrame: Typed frame
+        """
+        with self.lock:
+            if self.database:
+                return self.database.team(form, team)
+            frame = self.data_frames[form]
+            teams = pandas.to_numeric(
+                frame["teamNumber"].astype(str).str.strip().str.removeprefix("frc"),
+                errors="coerce",
+            )
+            return frame[teams == key_index.team_number(team)]
+
+    def persist(self, form: str, compact: bool = False) -> None:
+        """Write a form's new rows (or the whole form) to the transfer directory
+        and queue them for every mirror
+
+        Args:
+            form (str): Form name
+            compact (bool, optional): Rewrite the whole file. Defaults to False.
+        """
+        write = self.writer.compact if compact else self.writer.append
+        with self.lock:
+            logging.info("transfering data to %s", self.directory)
+            write(self.directory, form, self.event_id, self.data_frames[form])
+            self._remember(form)
+            # keep the CSV tail a reload has to parse on top of the snapshot short
+            behind = len(self.data_frames[form]) - (self._snapshot_rows.get(form) or 0)
+            if snapshot.available() and (
+                compact or behind >= constants.TOTALS_COMPACT_INTERVAL
+            ):
+                self._snapshot(form)
+
+            for mirror_dir in self.mirrors:
+                self.disk_mirror.submit(
+                    mirror_dir, form, self.event_id, self.data_frames[form], compact
+                )
+
+    def compact(self) -> None:
+        """
+        Rewrite every totals file in the transfer directory and mirrors
+        """
+        with self.lock:
+            for form in self.data_frames:
+                self.persist(form, compact=True)
+            self.snapshot()
+
+    def close(self) -> None:
+        """
+        Finish pending mirror writes, snapshot and close open totals files
+        """
+        self.disk_mirror.close()
+        self.snapshot()
+        self.writer.close()
+        with self.lock:
+            if self.database:
+                self.database.close()
+                self.database = None
+
+    def _mirror_all(self, directory: str) -> None:
+        if not self.event_id:
+            return
+        for form, frame in self.data_frames.items():
+            if not frame.empty:
+                self.disk_mirror.submit(directory, form, self.event_id, frame, True)
+
+
+def _file_signature(path: str) -> tuple[int, int]:
+    info = os.stat(path)
+    return (info.st_mtime_ns, info.st_size)
+
+
+class IngestEngine:
+    """
+    Scan ingest: payload in, `IngestResult` out
+    """
+
+    def __init__(self, store: EventStore) -> None:
+        self.store = store
+        self.decoder = decoder.PayloadDecoder()
+
+    def ingest(self, payload: str, allow_duplicate: bool = False) -> IngestResult:
+        """Ingest one scan payload
+
+        Args:
+            payload (str): Raw payload as scanned
+            allow_duplicate (bool, optional): Add the scan even if it is a repeat.
+                                              Defaults to False.
+
+        Returns:
+            IngestResult: What happened to the payload
+        """
+        if not os.path.isdir(self.store.directory):
+            return IngestResult(
+                IngestStatus.REJECTED,
+                payload,
+                error=constants.DataError.DIRECTORY_MISSING,
+            )
+
+        decoded = self.decoder.decode(payload)
+        logging.info("Data transfer started on form %s", decoded.form)
+
+        error = decoder.validate(decoded)
+        if error:
+            return IngestResult(
+                IngestStatus.REJECTED,
+                payload,
+                decoded.form,
+                error,
+                decoded.errors,
+            )
+
+        form = decoded.form
+        record = decoded.record
+        with self.store.lock:
+            key = self.store.index.record_key(form, record)
+            if self.store.contains(form, key) and not allow_duplicate:
+                logging.warning(
+                    "Attempting to import repeated data team number: %s",
+                    record["teamNumber"],
+                )
+                return IngestResult(
+                    IngestStatus.DUPLICATE, payload, form, team=record["teamNumber"]
+                )
+
+            try:
+                self.store.add(form, [decoded.values], [key])
+            except schema.SchemaError as error:
+                logging.error("Malformed scan, %s", error)
+                return IngestResult(
+                    IngestStatus.REJECTED,
+                    payload,
+                    form,
+                    constants.DataError.DATA_MALFORMED,
+                    [decoder.FieldError(error.column, str(error.value), error.dtype)],
+                )
+            frame = self.store.data_frames[form]
+            return IngestResult(
+                IngestStatus.ADDED,
+                payload,
+                form,
+                team=record["teamNumber"],
+                label=frame.index[-1],
+                values=frame.iloc[-1].tolist(),
+            )
+
+    def ingest_batch(
+        self, payloads: list[tuple[str, str]]
+    ) -> batch_import.BatchResult | None:
+        """Ingest many payloads at once, repeats are skipped
+
+        Args:
+            payloads (list[tuple[str, str]]): (location, payload) pairs
+
+        Returns:
+            batch_import.BatchResult | None: Summary, None if the transfer
+                                             directory is missing
+        """
+        if not os.path.isdir(self.store.directory):
+            return None
+
+        with self.store.lock:
+            result = batch_import.import_payloads(
+                payloads, self.store.data_frames, self.store.index, self.decoder
+            )
+            for form, added in result.added.items():
+                if not added:
+                    continue
+                if self.store.database:
+                    sqlite_store.insert_frame(
+                        self.store.database,
+                        form,
+                        self.store.data_frames[form].tail(added),
+                    )
+                self.store.persist(form, compact=True)
+        return result
+
+
+def read_source(source: str, baud: int) -> typing.Iterator[str]:
+    """Yield payloads from stdin ("-"), a file, or a serial device
+
+    Args:
+        source (str): "-", file path or serial device path
+        baud (int): Baud rate for serial devices
+
+    Yields:
+        str: Payloads
+    """
+    if source == "-":
+        yield from (line for line in sys.stdin if line.strip())
+        return
+
+    if not stat.S_ISCHR(os.stat(source).st_mode):
+        with open(source, "r", encoding="utf-8", errors="replace") as file:
+            yield from (line for line in file if line.strip())
+        return
+
+    framer = serial_framer.SerialFramer(constants.MAX_FRAME_SIZE)
+    fd = os.open(source, os.O_RDONLY | getattr(os, "O_NOCTTY", 0))
+    try:
+        _configure_tty(fd, baud)
+        while chunk := os.read(fd, 4096):
+            yield from framer.feed(chunk)
+    finally:
+        os.close(fd)
+
+
+def _configure_tty(fd: int, baud: int) -> None:
+    try:
+        import termios  # pylint: disable=import-outside-toplevel
+        import tty  # pylint: disable=import-outside-toplevel
+    except ImportError:
+        logging.warning("termios unavailable, using the device's current settings")
+        return
+
+    tty.setraw(fd)
+    attrs = termios.tcgetattr(fd)
+    speed = getattr(termios, f"B{baud}", None)
+    if speed is None:
+        logging.warning("Unsupported baud rate %s, leaving it unchanged", baud)
+    else:
+        attrs[4] = attrs[5] = speed
+    attrs[6][termios.VMIN] = 1
+    attrs[6][termios.VTIME] = 0
+    termios.tcsetattr(fd, termios.TCSANOW, attrs)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Command-line entry point
+
+    Returns:
+        int: Exit code, 1 if any payload was rejected
+    """
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n", maxsplit=1)[0])
+    parser.add_argument(
+        "source", nargs="?", default="-", help="file, serial device, or - for stdin"
+    )
+    parser.add_argument("--directory", required=True, help="transfer directory")
+    parser.add_argument("--event", required=True, help="event code")
+    parser.add_argument(
+        "--mirror", action="append", default=[], help="also write to this directory"
+    )
+    parser.add_argument(
+        "--allow-duplicates", action="store_true", help="add repeated scans"
+    )
+    parser.add_argument("--baud", type=int, default=115200)
+    parser.add_argument(
+        "--durability",
+        choices=[policy.value for policy in storage.Durability],
+        default=storage.Durability.GROUP.value,
+        help="when totals files are fsynced",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=[backend.value for backend in Backend],
+        default=Backend.CSV.value,
+        help="keep scans in totals files only, or in an SQLite database",
+    )
+    parser.add_argument(
+        "--team", help="print the stored scans of this team instead of ingesting"
+    )
+    args = parser.parse_args(argv)
+
+    store = EventStore(backend=Backend(args.backend))
+    store.set_durability(storage.Durability(args.durability))
+    store.load(args.directory, args.event)
+    store.set_mirrors(args.mirror)
+    engine = IngestEngine(store)
+
+    if args.team is not None:
+        try:
+            for form in schema.HEADERS:
+                frame = store.team(form, args.team)
+                if not frame.empty:
+                    print(frame.to_json(orient="records", lines=True).rstrip("\n"))
+        finally:
+            store.close()
+        return 0
+
+    rejected = 0
+    try:
+        for payload in read_source(args.source, args.baud):
+            result = engine.ingest(payload, args.allow_duplicates)
+            rejected += result.status == IngestStatus.REJECTED
+            print(
+                json.dumps(
+                    {
+                        "status": result.status.name,
+                        "form": result.form,
+                        "team": result.team,
+                        "error": result.error.name if result.error else None,
+                        "field_errors": [str(error) for error in result.field_errors],
+                    }
+                ),
+                flush=True,
+            )
+    except KeyboardInterrupt:
+        pass
+    finally:
+        store.close()
+
+    return 1 if rejected else 0
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING, stream=sys.stderr)
+    sys.exit(main())
@@ -0,0 +1,151 @@
+"""
+Hash index of the keys used to detect repeated scans
+"""
+
+import threading
+
+import pandas
+
+KEY_COLUMNS: dict[str, tuple[str, ...]] = {
+    "pit": ("teamNumber",),
+    "qual": ("teamNumber", "matchNumber"),
+    "playoff": ("teamNumber", "matchNumber"),
+}
+
+
+def team_number(value) -> int | None:
+    """Convert a team number as stored in scans ("frc6369") to an int
+
+    Args:
+        value (Any): Team number from a scan or totals file
+
+    Returns:
+        int | None: Team number, None if it can't be parsed
+    """
+    text = str(value).strip().removeprefix("frc")
+    if not text.isdigit():
+        return None
+    return int(text)
+
+
+def match_number(value) -> int | None:
+    """Convert a match number from a scan or totals file to an int
+
+    Args:
+        value (Any): Match number
+
+    Returns:
+        int | None: Match number, None if it can't be parsed
+    """
+    if isinstance(value, bool) or value is None:
+        return None
+    if isinstance(value, int):
+        return value
+    if isinstance(value, float):
+        return None if value != value else int(value)  # NaN check
+    text = str(value).strip()
+    return int(text) if text.isdigit() else None
+
+
+class KeyIndex:
+    """
+    Per-form set of dedupe keys, (team,) for pit and (team, match) for matches
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._keys: dict[str, set[tuple[int, ...]]] = {
+            form: set() for form in KEY_COLUMNS
+        }
+
+    def rebuild(self, data_frames: dict[str, pandas.DataFrame]) -> None:
+        """Rebuild the index from loaded data
+
+        Args:
+            data_frames (dict[str, pandas.DataFrame]): Data for each form
+        """
+        keys = {form: set() for form in KEY_COLUMNS}
+
+        for form, columns in KEY_COLUMNS.items():
+            frame = data_frames.get(form)
+            if frame is None or frame.empty or not set(columns) <= set(frame.columns):
+                continue
+
+            teams = pandas.to_numeric(
+                frame["teamNumber"].astype(str).str.strip().str.removeprefix("frc"),
+                errors="coerce",
+            )
+            parts = [teams]
+            if "matchNumber" in columns:
+                parts.append(pandas.to_numeric(frame["matchNumber"], errors="coerce"))
+
+            valid = pandas.concat(parts, axis=1).dropna().astype("int64")
+            keys[form] = set(valid.itertuples(index=False, name=None))
+
+        with self._lock:
+            self._keys = keys
+
+    def key(self, form: str, team, match=None) -> tuple[int, ...] | None:
+        """Build the dedupe key for a scan
+
+        Args:
+            form (str): Form name
+            team (Any): Team number as scanned
+            match (Any, optional): Match number as scanned. Defaults to None.
+
+        Returns:
+            tuple[int, ...] | None: Key, None if a key column can't be parsed
+        """
+        team = team_number(team)
+        if team is None:
+            return None
+        if len(KEY_COLUMNS[form]) == 1:
+            return (team,)
+
+        match = match_number(match)
+        if match is None:
+            return None
+        return (team, match)
+
+    def record_key(self, form: str, record: dict) -> tuple[int, ...] | None:
+        """Build the dedupe key for a decoded scan
+
+        Args:
+            form (str): Form name
+            record (dict): Scan values keyed by column name
+
+        Returns:
+            tuple[int, ...] | None: Key, None if a key column can't be parsed
+        """
+        return self.key(form, record["teamNumber"], record.get("matchNumber"))
+
+    def contains(self, form: str, key: tuple[int, ...] | None) -> bool:
+        """Check if a key has already been ingested
+
+        Args:
+            form (str): Form name
+            key (tuple[int, ...] | None): Key from `key`
+
+        Returns:
+            bool: Whether the key is present
+        """
+        if key is None:
+            return False
+        with self._lock:
+            return key in self._keys[form]
+
+    def add(self, form: str, key: tuple[int, ...] | None) -> None:
+        """Record an ingested key
+
+        Args:
+            form (str): Form name
+            key (tuple[int, ...] | None): Key from `key`
+        """
+        if key is None:
+            return
+        with self._lock:
+            self._keys[form].add(key)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(keys) for keys in self._keys.values())
@@ -3,6 +3,13 @@
 Transfer data form scouting tablets using qr code scanner
 """
 
+from __future__ import annotations
+
+import time
+
+STARTUP_MARKS: list[tuple[str, float]] = [("start", time.perf_counter())]
+
+# pylint: disable=wrong-import-position
 import sys
 import os
 import logging
@@ -10,8 +17,7 @@ import traceback
 import typing
 import datetime
 import json
-
-import pandas
+import sqlite3
 
 from PySide6.QtWidgets import (
     QApplication,
@@ -41,6 +47,7 @@ from PySide6.QtWidgets import (
     QListWidgetItem,
     QScrollArea,
     QMenu,
+    QSpinBox,
 )
 from PySide6.QtCore import (
     QSettings,
@@ -52,21 +59,35 @@ from PySide6.QtCore import (
     QThread,
     QUrl,
     QPoint,
+    QTimer,
 )
 from PySide6.QtMultimedia import QSoundEffect
 from PySide6.QtGui import QCloseEvent, QPixmap, QIcon
 from PySide6.QtSerialPort import QSerialPort, QSerialPortInfo
-import qdarktheme
 import qtawesome
 
-import statbotics
-
 import disk_widget
 import disk_detector
-import data_models
 import constants
+import icon_cache
+import scan_queue
+import serial_framer
+import serial_options
 import utils
 
+# pandas and statbotics are slow to import, they are imported when first needed
+if typing.TYPE_CHECKING:
+    import pandas
+    import statbotics
+
+    import batch_import
+    import data_models
+    import ingest
+    import mirror
+    import storage
+
+STARTUP_MARKS.append(("imports", time.perf_counter()))
+
 __version__: typing.Final = "v2.0.0-state"
 
 settings: QSettings | None = None
@@ -74,169 +95,124 @@ win: QMainWindow | None = None
 
 
 class DataWorker(QObject):
-    finished = Signal(dict)
-    on_data_error = Signal(constants.DataError)
+    """
+    Long-lived ingest worker, lives on its own thread for the whole session
+
+    Thin Qt wrapper around `ingest.IngestEngine`, all prompts happen in the GUI.
+    The store is only used on this thread, a load holds its lock throughout
+    """
 
-    def __init__(self, data: str, savedir: str, savedisk: str | None) -> None:
+    ready = Signal(object, object)  # mirror.DiskMirror, data frames
+    finished = Signal(object, int)  # ingest.IngestResult, load generation
+    # batch_import.BatchResult | None, data frames after the import
+    batchFinished = Signal(object, object)
+    loaded = Signal(int, object, str)  # load generation, data frames, error message
+
+    def __init__(self, backend: str, durability: str) -> None:
         super().__init__()
-        self.data = data
-        self.savedir = savedir
-        self.savedisk = savedisk
+        self.backend = backend
+        self.durability = durability
+        self.engine: ingest.IngestEngine | None = None
+        self.generation = 0  # of the last load, results are tagged with it
 
-    def run(
-        self,
-        data_frames: pandas.DataFrame,
-        directory: str,
-        disk: disk_detector.Disk | None,
-        event_id: str,
-    ):
-        if not os.path.exists(directory):
-            msg = QMessageBox(win)
-            msg.setIcon(QMessageBox.Icon.Critical)
-            msg.setText(f"Directory {directory}\ndoes not exist\nData import cancelled")
-            msg.setWindowTitle("Data Error")
-            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
-            msg.exec()
-            self.finished.emit(data_frames)
-            return
-        data = list(utils.convert_types(self.data.strip("\r\n").split("||")))
-        form = data[0]
-        logging.info("Data transfer started on form %s", str(form))
-
-        if form == "pit":
-            header = constants.PIT_DATA_HEADER
-            if len(data) != len(header):
-                self.on_data_error.emit(constants.DataError.DATA_MALFORMED)
-                self.finished.emit(data_frames)
-                return
-        elif form == "qual":
-            header = constants.QUAL_DATA_HEADER
-            if len(data) != len(header):
-                self.on_data_error.emit(constants.DataError.DATA_MALFORMED)
-                self.finished.emit(data_frames)
-                return
-        elif form == "playoff":
-            header = constants.PLAYOFF_DATA_HEADER
-            if len(data) != len(header):
-                self.on_data_error.emit(constants.DataError.DATA_MALFORMED)
-                self.finished.emit(data_frames)
-                return
-        else:
-            self.on_data_error.emit(constants.DataError.UNKNOWN_FORM)
-            self.finished.emit(data_frames)
-            return
+    def setup(self):
+        """
+        Create the ingest engine, runs when the thread starts so pandas is
+        imported off the GUI thread
+        """
 
-        df = pandas.DataFrame([data], columns=header)
+        # pylint: disable=import-outside-toplevel
+        import ingest
+        import storage
 
-        add_to_df = True
+        store = ingest.EventStore(backend=ingest.Backend(self.backend))
+        store.set_durability(storage.Durability(self.durability))
+        self.engine = ingest.IngestEngine(store)
+        self.ready.emit(store.disk_mirror, dict(store.data_frames))
 
-        if df["teamNumber"].iloc[0] == "frcnull":
-            self.on_data_error.emit(constants.DataError.TEAM_NUMBER_NULL)
-            self.finished.emit(data_frames)
-            return
+    def run(self, data: str, allow_duplicate: bool):
+        import ingest  # pylint: disable=import-outside-toplevel
 
-        if form == "qual" or form == "playoff":
-            if df["matchNumber"].iloc[0] is None:
-                self.on_data_error.emit(constants.DataError.MATCH_NUMBER_NULL)
-                self.finished.emit(data_frames)
-                return
+        try:
+            result = self.engine.ingest(data, allow_duplicate)
+        except Exception:  # pylint: disable=broad-exception-caught
+            # always answer, the GUI waits for a result before the next scan
+            logging.exception("Ingest failed")
+            result = ingest.IngestResult(
+                ingest.IngestStatus.REJECTED,
+                data,
+                error=constants.DataError.DATA_MALFORMED,
+            )
+        self.finished.emit(result, self.generation)
 
-        # form type
-        if form == "pit":
-            # check for repeats
-            if int(df["teamNumber"].iloc[0].strip("frc")) in [
-                int(x.strip("frc")) for x in data_frames["pit"]["teamNumber"].to_list()
-            ]:
-                if (
-                    self.on_repeated_data("pit", df["teamNumber"].iloc[0])
-                    == QMessageBox.StandardButton.No
-                ):
-                    add_to_df = False
-        elif form == "qual":
-            # check for repeats
-            if (
-                int(df["teamNumber"].iloc[0].strip("frc"))
-                in [
-                    int(x.strip("frc"))
-                    for x in data_frames["qual"]["teamNumber"].to_list()
-                ]
-            ) and (
-                int(df["matchNumber"].iloc[0])
-                in [int(x) for x in data_frames["qual"]["matchNumber"].to_list()]
-            ):
-                if (
-                    self.on_repeated_data("qual", df["teamNumber"].iloc[0])
-                    == QMessageBox.StandardButton.No
-                ):
-                    add_to_df = False
-        elif form == "playoff":
-            # check for repeats
-            if (
-                int(df["teamNumber"].iloc[0].strip("frc"))
-                in [
-                    int(x.strip("frc"))
-                    for x in data_frames["playoff"]["teamNumber"].to_list()
-                ]
-            ) and (
-                int(df["matchNumber"].iloc[0])
-                in [int(x) for x in data_frames["playoff"]["matchNumber"].to_list()]
-            ):
-                if (
-                    self.on_repeated_data(
-                        "playoff", int(df["teamNumber"].iloc[0].strip("frc"))
-                    )
-                    == QMessageBox.StandardButton.No
-                ):
-                    add_to_df = False
+    def run_load(self, directory: str, event_id: str, generation: int):
+        """
+        Load an event's data, scans queued after this are ingested into it
+
+        The frames are sent along, the store may have moved on by the time
+        the GUI gets to them
+        """
+
+        self.generation = generation
+        error = ""
+        try:
+            self.engine.store.load(directory, event_id)
+        except (OSError, ValueError, sqlite3.Error) as load_error:
+            logging.exception("Failed to load %s from %s", event_id, directory)
+            error = str(load_error)
+        self.loaded.emit(generation, dict(self.engine.store.data_frames), error)
 
-        if add_to_df:
-            data_frames[form] = pandas.concat([data_frames[form], df])
+    def set_mirrors(self, mirrors: list):
+        """
+        Set the directories totals files are mirrored to
+        """
 
-        logging.info("transfering data to %s", directory)
+        self.engine.store.set_mirrors(mirrors)
 
-        # create directory structure
-        for form in data_frames:
-            if not os.path.exists(os.path.join(directory, form)):
-                os.mkdir(os.path.join(directory, form))
+    def set_durability(self, durability: str):
+        """
+        Set when totals files are fsynced
+        """
 
-            data_frames[form].to_csv(
-                os.path.join(directory, form, f"{event_id}_{form}_total.csv"),
-                index=False,
-            )
+        import storage  # pylint: disable=import-outside-toplevel
 
-        # create disk directory structure
-        if disk:
-            for form in data_frames:
-                if not os.path.exists(os.path.join(disk.mountpoint, form)):
-                    os.mkdir(os.path.join(disk.mountpoint, form))
-                    logging.info("Created directory structure on %s", disk.mountpoint)
+        self.engine.store.set_durability(storage.Durability(durability))
 
-                data_frames[form].to_csv(
-                    os.path.join(disk.mountpoint, form, f"{event_id}_{form}_total.csv"),
-                    index=False,
-                )
+    def set_backend(self, backend: str):
+        """
+        Switch storage backend, takes effect on the next load
+        """
+
+        import ingest  # pylint: disable=import-outside-toplevel
 
-        self.finished.emit(data_frames)
+        self.engine.store.set_backend(ingest.Backend(backend))
 
-    def on_repeated_data(self, form: str, team: int):
+    def compact(self):
         """
-        Display a warning for importing a repeat
+        Rewrite every totals file in the transfer directory and mirrors
         """
 
-        logging.warning("Attempting to import repeated data team number: %s", team)
+        if os.path.isdir(self.engine.store.directory):
+            self.engine.store.compact()
 
-        msg = QMessageBox(win)
-        msg.setIcon(QMessageBox.Icon.Warning)
-        msg.setText(
-            f"Repeated data import for {form} form.\nTeam Number: {team}\nImport anyway?"
-        )
-        msg.setWindowTitle("Data Error")
-        msg.setStandardButtons(
-            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-        )
+    def close(self):
+        """
+        Finish pending writes and close the store, runs as the thread finishes
+        """
+
+        if self.engine:
+            self.engine.store.close()
+
+    def run_batch(self, path: str):
+        """
+        Import a file or directory of recorded scans, repeats are skipped
+        """
 
-        ret = msg.exec()
-        return ret
+        import batch_import  # pylint: disable=import-outside-toplevel
+
+        logging.info("Batch import started from %s", path)
+        result = self.engine.ingest_batch(batch_import.read_payloads(path))
+        self.batchFinished.emit(result, dict(self.engine.store.data_frames))
 
 
 class EventCodeWorker(QObject):
@@ -320,6 +296,14 @@ class MatchMatchWorker(QObject):
 class MainWindow(QMainWindow):
     """Main Window"""
 
+    ingestRequested = Signal(str, bool)  # payload, allow duplicate
+    batchRequested = Signal(str)
+    loadRequested = Signal(str, str, int)  # directory, event, generation
+    mirrorsRequested = Signal(list)
+    durabilityRequested = Signal(str)
+    backendRequested = Signal(str)
+    compactRequested = Signal()
+
     HOME_IDX, ASSIGN_IDX, SETTINGS_IDX, ABOUT_IDX = range(4)
 
     def __init__(self) -> None:
@@ -334,23 +318,62 @@ class MainWindow(QMainWindow):
         self.serial.aboutToClose.connect(self.serial_close)
         self.serial.readyRead.connect(self.on_serial_recieve)
 
-        self.sbapi = statbotics.Statbotics()
+        self.sbapi: statbotics.Statbotics | None = None
 
         self.mediaplayer = QSoundEffect()
 
-        self.data_worker = None
         self.api_worker = None
-        self.worker_thread = None
+        self.api_thread = None
 
         self.is_scanning = False
 
-        self.data_buffer = ""  # data may come in split up
+        self.event_id: str = settings.value("event", "", type=str)
+        self.mirror_mode: str = settings.value("mirrorMode", "selected", type=str)
 
-        self.data_frames = {
-            "pit": pandas.DataFrame(),
-            "qual": pandas.DataFrame(),
-            "playoff": pandas.DataFrame(),
-        }
+        # set once the ingest worker has started, see on_ingest_ready
+        self.ingest_ready = False
+        self.disk_mirror: mirror.DiskMirror | None = None
+        self.form_models: dict[str, data_models.PandasModel] = {}
+        self.mirror_targets: list[str] = []
+
+        # one ingest worker for the whole session, fed through ingestRequested
+        self.ingest_thread = QThread()
+        self.data_worker = DataWorker(
+            settings.value("backend", "csv"), settings.value("durability", "group")
+        )
+        self.data_worker.moveToThread(self.ingest_thread)
+        self.ingest_thread.started.connect(self.data_worker.setup)
+        self.data_worker.ready.connect(self.on_ingest_ready)
+        self.data_worker.finished.connect(self.on_data_transfer_complete)
+        self.data_worker.batchFinished.connect(self.on_batch_import_complete)
+        self.data_worker.loaded.connect(self.on_event_loaded)
+        self.ingestRequested.connect(self.data_worker.run)
+        self.batchRequested.connect(self.data_worker.run_batch)
+        self.loadRequested.connect(self.data_worker.run_load)
+        self.mirrorsRequested.connect(self.data_worker.set_mirrors)
+        self.durabilityRequested.connect(self.data_worker.set_durability)
+        self.backendRequested.connect(self.data_worker.set_backend)
+        self.compactRequested.connect(self.data_worker.compact)
+        self.ingest_thread.finished.connect(
+            self.data_worker.close, Qt.ConnectionType.DirectConnection
+        )
+        self.ingest_thread.start()
+
+        # loads run on the ingest thread, after a pause in typing
+        self.load_generation = 0
+        self.loaded_rows: dict[str, int] = {}  # per form, as of the shown load
+        self.load_timer = QTimer(self)
+        self.load_timer.setSingleShot(True)
+        self.load_timer.setInterval(constants.LOAD_DEBOUNCE)
+        self.load_timer.timeout.connect(self.start_load)
+
+        # data may come in split up, or several records at once
+        self.serial_framer = serial_framer.SerialFramer(constants.MAX_FRAME_SIZE)
+
+        self.scan_queue = scan_queue.ScanQueue(
+            settings.value("queueSize", constants.INGEST_QUEUE_SIZE, type=int),
+            constants.INGEST_SPILL_FILE,
+        )
 
         self.root_widget = QWidget()
         self.setCentralWidget(self.root_widget)
@@ -468,21 +491,28 @@ class MainWindow(QMainWindow):
         valid = os.path.isdir(self.transfer_dir_textbox.text())
         if valid:
             self.transfer_dir_icon.setPixmap(
-                qtawesome.icon("mdi6.check-circle", color="#4caf50").pixmap(
+                icon_cache.icon("mdi6.check-circle", color="#4caf50").pixmap(
                     QSize(24, 24)
                 )
             )
         else:
             self.transfer_dir_icon.setPixmap(
-                qtawesome.icon("mdi6.alert", color="#f44336").pixmap(QSize(24, 24))
+                icon_cache.icon("mdi6.alert", color="#f44336").pixmap(QSize(24, 24))
             )
 
         self.disk_widget = disk_widget.DiskMgmtWidget(
             predicate=disk_detector.scouting_disk_predicate
         )
         self.disk_widget.set_select_visible(False)
+        self.disk_widget.diskFocused.connect(self.on_disk_focused)
+        self.disk_widget.disksChanged.connect(self.update_mirror_targets)
         self.drive_layout.addWidget(self.disk_widget)
 
+        self.data_loading_label = QLabel("Loading event data...")
+        self.data_loading_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.data_loading_label.setVisible(False)
+        self.drive_layout.addWidget(self.data_loading_label)
+
         self.data_view_tabs = QTabWidget()
         self.drive_layout.addWidget(self.data_view_tabs)
 
@@ -493,8 +523,6 @@ class MainWindow(QMainWindow):
         self.data_view_pit_layout.setContentsMargins(0, 0, 0, 0)
         self.data_view_pit_widget.setLayout(self.data_view_pit_layout)
 
-        self.pit_model = data_models.PandasModel(self.data_frames["pit"])
-
         self.pit_table_view = QTableView()
         self.pit_table_view.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers
@@ -503,7 +531,6 @@ class MainWindow(QMainWindow):
         self.pit_table_view.setSelectionMode(
             QAbstractItemView.SelectionMode.NoSelection
         )
-        self.pit_table_view.setModel(self.pit_model)
         self.pit_table_view.setHorizontalScrollMode(
             QAbstractItemView.ScrollMode.ScrollPerPixel
         )
@@ -516,8 +543,6 @@ class MainWindow(QMainWindow):
         self.data_view_qual_layout.setContentsMargins(0, 0, 0, 0)
         self.data_view_qual_widget.setLayout(self.data_view_qual_layout)
 
-        self.qual_model = data_models.PandasModel(self.data_frames["qual"])
-
         self.qual_table_view = QTableView()
         self.qual_table_view.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers
@@ -526,7 +551,6 @@ class MainWindow(QMainWindow):
         self.qual_table_view.setSelectionMode(
             QAbstractItemView.SelectionMode.NoSelection
         )
-        self.qual_table_view.setModel(self.qual_model)
         self.qual_table_view.setHorizontalScrollMode(
             QAbstractItemView.ScrollMode.ScrollPerPixel
         )
@@ -539,8 +563,6 @@ class MainWindow(QMainWindow):
         self.data_view_playoff_layout.setContentsMargins(0, 0, 0, 0)
         self.data_view_playoff_widget.setLayout(self.data_view_playoff_layout)
 
-        self.playoff_model = data_models.PandasModel(self.data_frames["playoff"])
-
         self.playoff_table_view = QTableView()
         self.playoff_table_view.setEditTriggers(
             QAbstractItemView.EditTrigger.NoEditTriggers
@@ -549,7 +571,6 @@ class MainWindow(QMainWindow):
         self.playoff_table_view.setSelectionMode(
             QAbstractItemView.SelectionMode.NoSelection
         )
-        self.playoff_table_view.setModel(self.playoff_model)
         self.playoff_table_view.setHorizontalScrollMode(
             QAbstractItemView.ScrollMode.ScrollPerPixel
         )
@@ -589,44 +610,50 @@ class MainWindow(QMainWindow):
 
         self.serial_bits = QComboBox()
         self.serial_bits.setMinimumWidth(110)
-        self.serial_bits.addItems([str(key) for key in constants.DATA_BITS])
+        self.serial_bits.addItems([str(key) for key in serial_options.DATA_BITS])
 
         if settings.contains("databits"):
             self.serial_bits.setCurrentText(settings.value("databits"))
-            self.serial.setDataBits(constants.DATA_BITS[settings.value("databits")])
+            self.serial.setDataBits(
+                serial_options.DATA_BITS[settings.value("databits")]
+            )
 
         self.serial_bits.currentTextChanged.connect(self.change_data_bits)
         self.serial_grid.addWidget(self.serial_bits, 1, 1)
 
         self.serial_stop = QComboBox()
         self.serial_stop.setMinimumWidth(110)
-        self.serial_stop.addItems([str(key) for key in constants.STOP_BITS])
+        self.serial_stop.addItems([str(key) for key in serial_options.STOP_BITS])
 
         if settings.contains("stopbits"):
             self.serial_stop.setCurrentText(settings.value("stopbits"))
-            self.serial.setStopBits(constants.STOP_BITS[settings.value("stopbits")])
+            self.serial.setStopBits(
+                serial_options.STOP_BITS[settings.value("stopbits")]
+            )
 
         self.serial_stop.currentTextChanged.connect(self.change_stop_bits)
         self.serial_grid.addWidget(self.serial_stop, 1, 2)
 
         self.serial_flow = QComboBox()
         self.serial_flow.setMinimumWidth(140)
-        self.serial_flow.addItems([str(key) for key in constants.FLOW_CONTROL])
+        self.serial_flow.addItems([str(key) for key in serial_options.FLOW_CONTROL])
 
         if settings.contains("flow"):
             self.serial_flow.setCurrentText(settings.value("flow"))
-            self.serial.setFlowControl(constants.FLOW_CONTROL[settings.value("flow")])
+            self.serial.setFlowControl(
+                serial_options.FLOW_CONTROL[settings.value("flow")]
+            )
 
         self.serial_flow.currentTextChanged.connect(self.change_flow)
         self.serial_grid.addWidget(self.serial_flow, 1, 3)
 
         self.serial_parity = QComboBox()
         self.serial_parity.setMinimumWidth(140)
-        self.serial_parity.addItems([str(key) for key in constants.PARITY])
+        self.serial_parity.addItems([str(key) for key in serial_options.PARITY])
 
         if settings.contains("parity"):
             self.serial_parity.setCurrentText(settings.value("parity"))
-            self.serial.setParity(constants.PARITY[settings.value("parity")])
+            self.serial.setParity(serial_options.PARITY[settings.value("parity")])
 
         self.serial_parity.currentTextChanged.connect(self.change_parity)
         self.serial_grid.addWidget(self.serial_parity, 1, 4)
@@ -641,12 +668,52 @@ class MainWindow(QMainWindow):
         self.connection_icon = qtawesome.IconWidget()
         self.connection_icon.setAlignment(Qt.AlignmentFlag.AlignCenter)
         self.connection_icon.setIconSize(QSize(256, 256))
-        self.connection_icon.setIcon(qtawesome.icon("mdi6.serial-port"))
+        self.connection_icon.setIcon(icon_cache.icon("mdi6.serial-port"))
         self.scanner_layout.addWidget(self.connection_icon)
 
+        self.queue_label = QLabel()
+        self.queue_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.scanner_layout.addWidget(self.queue_label)
+
+        self.mirror_label = QLabel()
+        self.mirror_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        self.scanner_layout.addWidget(self.mirror_label)
+
+        self.mirror_timer = QTimer(self)
+        self.mirror_timer.timeout.connect(self.update_mirror_lag)
+
         self.scanner_layout.addStretch()
 
-        # * ASSIGN * #
+        # other pages are built on first visit, see nav
+        self.page_builders = {
+            self.ASSIGN_IDX: self.build_assign_page,
+            self.SETTINGS_IDX: self.build_settings_page,
+            self.ABOUT_IDX: self.build_about_page,
+        }
+        for page in self.page_builders:
+            self.app_widget.insertWidget(page, QWidget())
+
+        STARTUP_MARKS.append(("home page", time.perf_counter()))
+
+        # * UI post-load *#
+        self.spin_animation = qtawesome.Spin(self.connection_icon, interval=5, step=2)
+
+        # * LOAD STARTING STATE *#
+        self.set_data_loading(True)
+        self.start_load()
+        self.update_queue_depth()
+        # port enumeration can be slow, let the window paint first
+        QTimer.singleShot(0, self.update_serial_ports)
+        QTimer.singleShot(0, self.report_startup)
+
+        if settings.contains("touchui"):
+            self.set_touch_mode(settings.value("touchui", type=bool))
+
+    def build_assign_page(self):
+        """
+        Build the Assign page
+        """
+
         self.assign_widget = QTabWidget()
         self.app_widget.insertWidget(self.ASSIGN_IDX, self.assign_widget)
 
@@ -882,7 +949,11 @@ class MainWindow(QMainWindow):
         self.assign_match_tablets_layout = QHBoxLayout()
         self.assign_match_tablets_widget.setLayout(self.assign_match_tablets_layout)
 
-        # * SETTINGS * #
+    def build_settings_page(self):
+        """
+        Build the Settings page
+        """
+
         self.settings_widget = QWidget()
         self.app_widget.insertWidget(self.SETTINGS_IDX, self.settings_widget)
 
@@ -899,6 +970,26 @@ class MainWindow(QMainWindow):
         self.settings_emulate_scan.clicked.connect(self.emulate_scan)
         self.settings_dev_layout.addWidget(self.settings_emulate_scan)
 
+        self.settings_compact_totals = QPushButton("Compact Totals Files")
+        self.settings_compact_totals.clicked.connect(self.compact_totals)
+        self.settings_dev_layout.addWidget(self.settings_compact_totals)
+
+        self.settings_import_file = QPushButton("Import Scan File")
+        self.settings_import_file.clicked.connect(
+            lambda: self.batch_import(
+                QFileDialog.getOpenFileName(self, "Select Scan File")[0]
+            )
+        )
+        self.settings_dev_layout.addWidget(self.settings_import_file)
+
+        self.settings_import_dir = QPushButton("Import Scan Directory")
+        self.settings_import_dir.clicked.connect(
+            lambda: self.batch_import(
+                QFileDialog.getExistingDirectory(self, "Select Scan Directory")
+            )
+        )
+        self.settings_dev_layout.addWidget(self.settings_import_dir)
+
         self.settings_ui_box = QGroupBox("UI")
         self.settings_layout.addWidget(self.settings_ui_box)
 
@@ -906,9 +997,62 @@ class MainWindow(QMainWindow):
         self.settings_ui_box.setLayout(self.settings_ui_layout)
 
         self.settings_touchui = QCheckBox("Touch UI")
+        self.settings_touchui.setChecked(settings.value("touchui", False, type=bool))
         self.settings_touchui.stateChanged.connect(self.set_touch_mode)
         self.settings_ui_layout.addWidget(self.settings_touchui)
 
+        self.settings_ingest_box = QGroupBox("Ingest")
+        self.settings_layout.addWidget(self.settings_ingest_box)
+
+        self.settings_ingest_layout = QHBoxLayout()
+        self.settings_ingest_box.setLayout(self.settings_ingest_layout)
+
+        self.settings_queue_label = QLabel("Scan Queue Size")
+        self.settings_ingest_layout.addWidget(self.settings_queue_label)
+
+        self.settings_queue_size = QSpinBox()
+        self.settings_queue_size.setRange(1, 10000)
+        self.settings_queue_size.setValue(self.scan_queue.maxsize)
+        self.settings_queue_size.valueChanged.connect(self.change_queue_size)
+        self.settings_ingest_layout.addWidget(self.settings_queue_size)
+
+        self.settings_durability_label = QLabel("Durability")
+        self.settings_ingest_layout.addWidget(self.settings_durability_label)
+
+        self.settings_durability = QComboBox()
+        self.settings_durability.addItem("Sync Every Scan", "sync")
+        self.settings_durability.addItem("Group Commit", "group")
+        self.settings_durability.addItem("OS Buffered", "buffered")
+        self.settings_durability.setCurrentIndex(
+            self.settings_durability.findData(settings.value("durability", "group"))
+        )
+        self.settings_durability.currentIndexChanged.connect(self.change_durability)
+        self.settings_ingest_layout.addWidget(self.settings_durability)
+
+        self.settings_backend_label = QLabel("Storage")
+        self.settings_ingest_layout.addWidget(self.settings_backend_label)
+
+        self.settings_backend = QComboBox()
+        self.settings_backend.addItem("CSV Files", "csv")
+        self.settings_backend.addItem("SQLite Database", "sqlite")
+        self.settings_backend.setCurrentIndex(
+            self.settings_backend.findData(settings.value("backend", "csv"))
+        )
+        self.settings_backend.currentIndexChanged.connect(self.change_backend)
+        self.settings_ingest_layout.addWidget(self.settings_backend)
+
+        self.settings_mirror_label = QLabel("Mirror To")
+        self.settings_ingest_layout.addWidget(self.settings_mirror_label)
+
+        self.settings_mirror = QComboBox()
+        self.settings_mirror.addItem("Selected Disk", "selected")
+        self.settings_mirror.addItem("All Scouting Disks", "all")
+        self.settings_mirror.setCurrentIndex(
+            self.settings_mirror.findData(self.mirror_mode)
+        )
+        self.settings_mirror.currentIndexChanged.connect(self.change_mirror_mode)
+        self.settings_ingest_layout.addWidget(self.settings_mirror)
+
         self.settings_event_box = QGroupBox("Event")
         self.settings_layout.addWidget(self.settings_event_box)
 
@@ -917,17 +1061,19 @@ class MainWindow(QMainWindow):
 
         self.event_entry = QComboBox()
         self.event_entry.setEditable(True)
+        self.event_entry.setEditText(self.event_id)
         self.event_entry.currentTextChanged.connect(self.on_event_changed)
         self.settings_event_layout.addWidget(self.event_entry)
 
-        if settings.contains("event"):
-            self.event_entry.setEditText(settings.value("event", type=str))
-
         self.event_fetch = QPushButton("Fetch")
         self.event_fetch.clicked.connect(self.fetch_events)
         self.settings_event_layout.addWidget(self.event_fetch)
 
-        # * ABOUT * #
+    def build_about_page(self):
+        """
+        Build the About page
+        """
+
         self.about_widget = QWidget()
         self.app_widget.insertWidget(self.ABOUT_IDX, self.about_widget)
 
@@ -966,20 +1112,65 @@ class MainWindow(QMainWindow):
         )
         self.about_layout.addWidget(self.about_description, 2, 1)
 
-        # * UI post-load *#
-        self.spin_animation = qtawesome.Spin(self.connection_icon, interval=5, step=2)
+    def report_startup(self):
+        """
+        Report how long each startup step took in the log and the status bar,
+        runs once the event loop is up
+        """
 
-        # * LOAD STARTING STATE *#
-        self.attempt_load_csv()
-        self.update_serial_ports()
+        STARTUP_MARKS.append(("first paint", time.perf_counter()))
+        steps = [
+            f"{name} {(end - begin) * 1000:.0f} ms"
+            for (_, begin), (name, end) in zip(STARTUP_MARKS, STARTUP_MARKS[1:])
+        ]
+        total = (STARTUP_MARKS[-1][1] - STARTUP_MARKS[0][1]) * 1000
+        logging.info("Startup took %.0f ms: %s", total, ", ".join(steps))
 
-        if settings.contains("touchui"):
-            self.set_touch_mode(settings.value("touchui", type=bool))
-            self.settings_touchui.setChecked(settings.value("touchui", type=bool))
+        self.statusBar().showMessage(
+            f"Started in {total:.0f} ms", constants.STARTUP_REPORT_TIMEOUT
+        )
+        self.statusBar().setToolTip("\n".join(steps))
+
+    def on_ingest_ready(
+        self, disk_mirror: mirror.DiskMirror, data_frames: dict[str, pandas.DataFrame]
+    ):
+        """
+        Show the event's tables once the ingest worker has created the store
+        """
+
+        import data_models  # pylint: disable=import-outside-toplevel
+
+        self.ingest_ready = True
+        self.disk_mirror = disk_mirror
+        self.form_models = {
+            form: data_models.PandasModel(frame) for form, frame in data_frames.items()
+        }
+        self.pit_table_view.setModel(self.form_models["pit"])
+        self.qual_table_view.setModel(self.form_models["qual"])
+        self.playoff_table_view.setModel(self.form_models["playoff"])
+
+        self.mirror_timer.start(constants.MIRROR_LAG_INTERVAL)
+        # scans recovered from the spill file wait for the worker like new ones
+        self.process_scan_queue()
+
+        logging.info(
+            "Ingest engine ready %.0f ms after launch",
+            (time.perf_counter() - STARTUP_MARKS[0][1]) * 1000,
+        )
 
     def nav(self, page: int):
         """Navigate to a page in app_widget using buttons"""
 
+        if page in self.page_builders:
+            placeholder = self.app_widget.widget(page)
+            start = time.perf_counter()
+            self.page_builders.pop(page)()
+            self.app_widget.removeWidget(placeholder)
+            placeholder.deleteLater()
+            logging.info(
+                "Built page %s in %.0f ms", page, (time.perf_counter() - start) * 1000
+            )
+
         for button in self.navigation_buttons:
             button.setChecked(False)
 
@@ -1019,7 +1210,9 @@ class MainWindow(QMainWindow):
         settings.setValue("touchui", enabled)
 
     def on_event_changed(self):
-        settings.setValue("event", self.event_entry.currentText())
+        self.event_id = self.event_entry.currentText()
+        settings.setValue("event", self.event_id)
+        self.attempt_load_csv()
 
     def select_transfer_dir(self) -> None:
         """
@@ -1038,51 +1231,84 @@ class MainWindow(QMainWindow):
         valid = os.path.isdir(self.transfer_dir_textbox.text())
         if valid:
             self.transfer_dir_icon.setPixmap(
-                qtawesome.icon("mdi6.check-circle", color="#4caf50").pixmap(
+                icon_cache.icon("mdi6.check-circle", color="#4caf50").pixmap(
                     QSize(24, 24)
                 )
             )
         else:
             self.transfer_dir_icon.setPixmap(
-                qtawesome.icon("mdi6.alert", color="#f44336").pixmap(QSize(24, 24))
+                icon_cache.icon("mdi6.alert", color="#f44336").pixmap(QSize(24, 24))
             )
         settings.setValue("transferDir", self.transfer_dir_textbox.text())
 
         self.attempt_load_csv()
 
+    def on_disk_focused(self, _disk: disk_detector.Disk | None):
+        if self.mirror_mode == "selected":
+            self.update_mirror_targets()
+
+    def update_mirror_targets(self):
+        """
+        Mirror to the selected disk, or every scouting disk in "all" mode
+        """
+
+        if self.mirror_mode == "all":
+            disks = self.disk_widget.get_disks()
+        else:
+            disks = [self.disk_widget.get_selected_disk()]
+        self.mirror_targets = [disk.mountpoint for disk in disks if disk]
+        self.mirrorsRequested.emit(self.mirror_targets)
+
     def attempt_load_csv(self):
-        event_id = self.event_entry.currentText()
-        for form in self.data_frames:
-            if os.path.exists(
-                os.path.join(
-                    self.transfer_dir_textbox.text(),
-                    form,
-                    f"{event_id}_{form}_total.csv",
-                )
-            ):
-                self.data_frames[form] = pandas.read_csv(
-                    os.path.join(
-                        self.transfer_dir_textbox.text(),
-                        form,
-                        f"{event_id}_{form}_total.csv",
-                    )
-                )
-            elif form == "pit":
-                self.data_frames["pit"] = pandas.DataFrame(
-                    columns=constants.PIT_DATA_HEADER
-                )
-            elif form == "qual":
-                self.data_frames["qual"] = pandas.DataFrame(
-                    columns=constants.QUAL_DATA_HEADER
-                )
-            elif form == "playoff":
-                self.data_frames["playoff"] = pandas.DataFrame(
-                    columns=constants.PLAYOFF_DATA_HEADER
-                )
+        """
+        Reload event data once the path and event stop changing
+        """
+
+        self.load_timer.start()
+
+    def start_load(self):
+        """
+        Load event data on the ingest thread
+        """
+
+        self.load_timer.stop()
+        self.load_generation += 1
+        self.set_data_loading(True)
+        self.loadRequested.emit(
+            self.transfer_dir_textbox.text(),
+            self.event_id,
+            self.load_generation,
+        )
 
-        self.pit_model.load_data(self.data_frames["pit"])
-        self.qual_model.load_data(self.data_frames["qual"])
-        self.playoff_model.load_data(self.data_frames["playoff"])
+    def on_event_loaded(
+        self, generation: int, data_frames: dict[str, pandas.DataFrame], error: str
+    ):
+        if generation != self.load_generation:
+            return  # superseded by a newer load
+
+        for form, model in self.form_models.items():
+            model.load_data(data_frames[form])
+        self.loaded_rows = {form: len(frame) for form, frame in data_frames.items()}
+        self.set_data_loading(False)
+
+        if error:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setText("Failed to load event data")
+            msg.setWindowTitle("Data Error")
+            msg.setDetailedText(error)
+            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+            msg.exec()
+
+    def set_data_loading(self, loading: bool):
+        """
+        Show that event data is being loaded
+        """
+
+        self.data_loading_label.setVisible(loading)
+        self.pit_table_view.setEnabled(not loading)
+        self.qual_table_view.setEnabled(not loading)
+        self.playoff_table_view.setEnabled(not loading)
 
     def update_serial_ports(self):
         """
@@ -1108,7 +1334,7 @@ class MainWindow(QMainWindow):
         Set data bits from combo box
         """
 
-        bits = constants.DATA_BITS[self.serial_bits.currentText()]
+        bits = serial_options.DATA_BITS[self.serial_bits.currentText()]
         self.serial.setDataBits(bits)
         settings.setValue("databits", self.serial_bits.currentText())
 
@@ -1117,7 +1343,7 @@ class MainWindow(QMainWindow):
         Set stop bits from combo box
         """
 
-        stop_bits = constants.STOP_BITS[self.serial_stop.currentText()]
+        stop_bits = serial_options.STOP_BITS[self.serial_stop.currentText()]
         self.serial.setStopBits(stop_bits)
         settings.setValue("stopbits", self.serial_stop.currentText())
 
@@ -1126,7 +1352,7 @@ class MainWindow(QMainWindow):
         Set flow control from combo box
         """
 
-        flow = constants.FLOW_CONTROL[self.serial_flow.currentText()]
+        flow = serial_options.FLOW_CONTROL[self.serial_flow.currentText()]
         self.serial.setFlowControl(flow)
         settings.setValue("flow", self.serial_flow.currentText())
 
@@ -1135,7 +1361,7 @@ class MainWindow(QMainWindow):
         Set parity type from combo box
         """
 
-        parity = constants.PARITY[self.serial_parity.currentText()]
+        parity = serial_options.PARITY[self.serial_parity.currentText()]
         self.serial.setParity(parity)
         settings.setValue("parity", self.serial_parity.currentText())
 
@@ -1168,24 +1394,25 @@ class MainWindow(QMainWindow):
         baud = int(self.serial_baud.currentText())
         self.serial.setBaudRate(baud)
 
-        bits = constants.DATA_BITS[self.serial_bits.currentText()]
+        bits = serial_options.DATA_BITS[self.serial_bits.currentText()]
         self.serial.setDataBits(bits)
 
-        stop_bits = constants.STOP_BITS[self.serial_stop.currentText()]
+        stop_bits = serial_options.STOP_BITS[self.serial_stop.currentText()]
         self.serial.setStopBits(stop_bits)
 
-        flow = constants.FLOW_CONTROL[self.serial_flow.currentText()]
+        flow = serial_options.FLOW_CONTROL[self.serial_flow.currentText()]
         self.serial.setFlowControl(flow)
 
-        parity = constants.PARITY[self.serial_parity.currentText()]
+        parity = serial_options.PARITY[self.serial_parity.currentText()]
         self.serial.setParity(parity)
 
+        self.serial_framer.reset()
         ok = self.serial.open(QIODevice.ReadWrite)
         if ok:
             logging.info("Connected to serial")
             self.set_serial_options_enabled(False)
             self.connection_icon.setIcon(
-                qtawesome.icon("mdi6.qrcode-scan", color="#03a9f4")
+                icon_cache.icon("mdi6.qrcode-scan", color="#03a9f4")
             )
         else:
             logging.error("Can't connect to serial port, %s", self.serial.error().name)
@@ -1208,7 +1435,7 @@ class MainWindow(QMainWindow):
 
         self.serial.close()
         self.set_serial_options_enabled(True)
-        self.connection_icon.setIcon(qtawesome.icon("mdi6.serial-port"))
+        self.connection_icon.setIcon(icon_cache.icon("mdi6.serial-port"))
 
     def on_serial_error(self):
         """
@@ -1236,7 +1463,7 @@ class MainWindow(QMainWindow):
             msg.exec()
 
             self.connection_icon.setIcon(
-                qtawesome.icon("mdi6.alert-decagram", color="#f44336")
+                icon_cache.icon("mdi6.alert-decagram", color="#f44336")
             )
 
     def serial_close(self):
@@ -1255,46 +1482,110 @@ class MainWindow(QMainWindow):
 
     def on_serial_recieve(self):
         self.connection_icon.setIcon(
-            qtawesome.icon(
+            icon_cache.icon(
                 "mdi6.loading", color="#03a9f4", animation=self.spin_animation
             )
         )
         data = self.serial.readAll()
-        self.data_buffer += data.data().decode()
-        if self.data_buffer.endswith("\n"):
-            self.on_data_retrieved(self.data_buffer)
-            self.data_buffer = ""
+        for record in self.serial_framer.feed(data.data()):
+            self.on_data_retrieved(record)
 
     def on_data_retrieved(self, data: str):
-        if not self.is_scanning:
+        self.scan_queue.put(data)
+        self.process_scan_queue()
+
+    def process_scan_queue(self):
+        """
+        Start processing the next queued scan if the worker is ready and idle
+        """
+
+        if self.ingest_ready and not self.is_scanning and len(self.scan_queue):
             self.is_scanning = True
+            self.ingestRequested.emit(self.scan_queue.get(), False)
+
+        self.update_queue_depth()
+
+    def update_queue_depth(self):
+        """
+        Show the number of scans waiting to be processed
+        """
 
-            if self.disk_widget.get_selected_disk() is None:
-                disk = None
+        self.queue_label.setText(
+            f"Queued scans: {len(self.scan_queue)} (spilled: {self.scan_queue.spilled})"
+        )
+
+    def update_mirror_lag(self):
+        """
+        Show how far behind each mirrored disk is
+        """
+
+        lag = self.disk_mirror.lag()
+        errors = self.disk_mirror.errors()
+
+        lines = []
+        for directory in self.mirror_targets:
+            if directory in errors:
+                line = f"Disk {directory}: {lag.get(directory, 0)} rows, retrying"
+            elif lag.get(directory):
+                line = f"Disk {directory}: {lag[directory]} rows pending"
             else:
-                disk = self.disk_widget.get_selected_disk().mountpoint
-
-            self.worker_thread = QThread()
-
-            self.data_worker = DataWorker(data, self.transfer_dir_textbox.text(), disk)
-            self.data_worker.finished.connect(self.on_data_transfer_complete)
-            self.data_worker.on_data_error.connect(self.on_data_error)
-            self.data_worker.moveToThread(self.worker_thread)
-            self.worker_thread.started.connect(
-                lambda: self.data_worker.run(
-                    self.data_frames,
-                    self.transfer_dir_textbox.text(),
-                    self.disk_widget.get_selected_disk(),
-                    self.event_entry.currentText(),
-                )
-            )
+                line = f"Disk {directory}: up to date"
+            lines.append(line)
+
+        self.mirror_label.setText("\n".join(lines))
+        self.mirror_label.setToolTip(
+            "\n".join(f"{directory}: {error}" for directory, error in errors.items())
+        )
+
+    def change_queue_size(self):
+        """
+        Set scan queue bound from spin box
+        """
+
+        self.scan_queue.set_maxsize(self.settings_queue_size.value())
+        settings.setValue("queueSize", self.settings_queue_size.value())
+
+    def change_durability(self):
+        """
+        Set when totals files are fsynced from combo box
+        """
+
+        durability = self.settings_durability.currentData()
+        settings.setValue("durability", durability)
+        self.durabilityRequested.emit(durability)
+
+    def change_mirror_mode(self):
+        """
+        Set which disks are mirrored to from combo box
+        """
+
+        self.mirror_mode = self.settings_mirror.currentData()
+        settings.setValue("mirrorMode", self.mirror_mode)
+        self.update_mirror_targets()
+
+    def change_backend(self):
+        """
+        Set storage backend from combo box and reload the event
+        """
 
-            self.data_worker.finished.connect(self.worker_thread.quit)
+        backend = self.settings_backend.currentData()
+        settings.setValue("backend", backend)
+        self.backendRequested.emit(backend)
+        self.attempt_load_csv()
+
+    def statbotics_api(self) -> statbotics.Statbotics:
+        """
+        Statbotics client, created on first use to keep it out of startup
+        """
+
+        if self.sbapi is None:
+            import statbotics  # pylint: disable=import-outside-toplevel
 
-            self.worker_thread.start()
+            self.sbapi = statbotics.Statbotics()
+        return self.sbapi
 
     def fetch_events(self):
-        if self.worker_thread and self.worker_thread.isRunning():
+        if self.api_thread and self.api_thread.isRunning():
             msg = QMessageBox(self)
             msg.setIcon(QMessageBox.Icon.Critical)
             msg.setText("Another API operation is running")
@@ -1307,17 +1598,17 @@ class MainWindow(QMainWindow):
             )
 
             if ok:
-                self.worker_thread = QThread()
+                self.api_thread = QThread()
 
-                self.api_worker = EventCodeWorker(self.sbapi, district)
+                self.api_worker = EventCodeWorker(self.statbotics_api(), district)
                 self.api_worker.finished.connect(self.on_event_fetch_complete)
                 self.api_worker.on_error.connect(self.on_api_error)
-                self.api_worker.moveToThread(self.worker_thread)
-                self.worker_thread.started.connect(self.api_worker.run)
+                self.api_worker.moveToThread(self.api_thread)
+                self.api_thread.started.connect(self.api_worker.run)
 
-                self.api_worker.finished.connect(self.worker_thread.quit)
+                self.api_worker.finished.connect(self.api_thread.quit)
 
-                self.worker_thread.start()
+                self.api_thread.start()
 
     def on_event_fetch_complete(self, events: list):
         self.event_entry.clear()
@@ -1336,17 +1627,57 @@ class MainWindow(QMainWindow):
         msg.setStandardButtons(QMessageBox.StandardButton.Ok)
         msg.exec()
 
-    def on_data_transfer_complete(self, df: pandas.DataFrame):
+    def on_data_transfer_complete(self, result: ingest.IngestResult, generation: int):
+        import ingest  # pylint: disable=import-outside-toplevel
+
         self.connection_icon.setIcon(
-            qtawesome.icon("mdi6.qrcode-scan", color="#03a9f4")
+            icon_cache.icon("mdi6.qrcode-scan", color="#03a9f4")
         )
 
-        self.data_frames = df
-        self.pit_model.load_data(self.data_frames["pit"])
-        self.qual_model.load_data(self.data_frames["qual"])
-        self.playoff_model.load_data(self.data_frames["playoff"])
+        if result.status == ingest.IngestStatus.ADDED:
+            # went into a replaced event, or is part of the shown load already
+            if generation == self.load_generation and result.label >= (
+                self.loaded_rows.get(result.form, 0)
+            ):
+                self.form_models[result.form].append_row(result.label, result.values)
+        elif result.status == ingest.IngestStatus.DUPLICATE:
+            if self.on_repeated_data(result.form, result.team):
+                self.ingestRequested.emit(result.payload, True)
+                return
+        elif result.error == constants.DataError.DIRECTORY_MISSING:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setText(
+                f"Directory {self.transfer_dir_textbox.text()}\ndoes not exist\n"
+                "Data import cancelled"
+            )
+            msg.setWindowTitle("Data Error")
+            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+            msg.exec()
+        else:
+            for field_error in result.field_errors:
+                logging.error("Malformed scan, %s", field_error)
+            self.on_data_error(result.error)
 
         self.is_scanning = False
+        self.process_scan_queue()
+
+    def on_repeated_data(self, form: str, team: str) -> bool:
+        """
+        Ask whether to import a repeated scan anyway
+        """
+
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Warning)
+        msg.setText(
+            f"Repeated data import for {form} form.\nTeam Number: {team}\nImport anyway?"
+        )
+        msg.setWindowTitle("Data Error")
+        msg.setStandardButtons(
+            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+        )
+
+        return msg.exec() == QMessageBox.StandardButton.Yes
 
     def show_port_ref_error(self):
         """
@@ -1401,6 +1732,81 @@ class MainWindow(QMainWindow):
         with open("example_scan.txt", "r", encoding="utf-8") as file:
             self.on_data_retrieved(file.read().strip("\r\n ") + "\r\n")
 
+    def batch_import(self, path: str):
+        """
+        Import a file or directory of newline-delimited scans on the ingest worker
+        """
+
+        if not path:
+            return
+
+        if self.is_scanning:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setText("A scan is being processed, try again later")
+            msg.setWindowTitle("Import")
+            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+            msg.exec()
+            return
+
+        if not os.path.isdir(self.transfer_dir_textbox.text()):
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setText(
+                f"Directory {self.transfer_dir_textbox.text()}\ndoes not exist\n"
+                "Data import cancelled"
+            )
+            msg.setWindowTitle("Data Error")
+            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+            msg.exec()
+            return
+
+        self.is_scanning = True
+        self.batchRequested.emit(path)
+
+    def on_batch_import_complete(
+        self,
+        result: batch_import.BatchResult | None,
+        data_frames: dict[str, pandas.DataFrame],
+    ):
+        self.is_scanning = False
+        self.process_scan_queue()
+
+        if result is None:
+            self.on_data_error(constants.DataError.DIRECTORY_MISSING)
+            return
+
+        for form, added in result.added.items():
+            if added:
+                self.form_models[form].load_data(data_frames[form])
+
+        msg = QMessageBox(self)
+        msg.setIcon(QMessageBox.Icon.Information)
+        msg.setText(
+            f"Imported {result.total_added} scans\n"
+            f"Skipped {result.duplicates} repeats\n"
+            f"Rejected {len(result.errors)} malformed scans"
+        )
+        msg.setWindowTitle("Import")
+        msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+        msg.exec()
+
+    def compact_totals(self):
+        """
+        Rewrite every totals file in the transfer directory and selected disk
+        """
+
+        if self.is_scanning:
+            msg = QMessageBox(self)
+            msg.setIcon(QMessageBox.Icon.Critical)
+            msg.setText("A scan is being processed, try again later")
+            msg.setWindowTitle("Compact")
+            msg.setStandardButtons(QMessageBox.StandardButton.Ok)
+            msg.exec()
+            return
+
+        self.compactRequested.emit()
+
     def change_assign_pit_tablet_count(self, change: int):
         if self.assign_pit_tablets + change in range(1, 13):
             self.assign_pit_tablets += change
@@ -1642,17 +2048,17 @@ class MainWindow(QMainWindow):
             "",
         )
         if okPressed and text.strip() != "":
-            self.worker_thread = QThread()
+            self.api_thread = QThread()
 
-            self.api_worker = PitTeamWorker(self.sbapi, text)
+            self.api_worker = PitTeamWorker(self.statbotics_api(), text)
             self.api_worker.finished.connect(self.on_pit_generate_statbotics)
             self.api_worker.on_error.connect(self.on_api_error)
-            self.api_worker.moveToThread(self.worker_thread)
-            self.worker_thread.started.connect(self.api_worker.run)
+            self.api_worker.moveToThread(self.api_thread)
+            self.api_thread.started.connect(self.api_worker.run)
 
-            self.api_worker.finished.connect(self.worker_thread.quit)
+            self.api_worker.finished.connect(self.api_thread.quit)
 
-            self.worker_thread.start()
+            self.api_thread.start()
         else:
             QMessageBox.critical(self, "Error", "Please enter a code")
 
@@ -1665,18 +2071,18 @@ class MainWindow(QMainWindow):
             "",
         )
         if okPressed and text.strip() != "":
-            self.worker_thread = QThread()
+            self.api_thread = QThread()
 
-            self.api_worker = MatchMatchWorker(self.sbapi, text)
+            self.api_worker = MatchMatchWorker(self.statbotics_api(), text)
             self.api_worker.finished.connect(self.on_match_generate_statbotics)
             self.api_worker.pit_teams.connect(self.on_pit_teams)
             self.api_worker.on_error.connect(self.on_api_error)
-            self.api_worker.moveToThread(self.worker_thread)
-            self.worker_thread.started.connect(self.api_worker.run)
+            self.api_worker.moveToThread(self.api_thread)
+            self.api_thread.started.connect(self.api_worker.run)
 
-            self.api_worker.finished.connect(self.worker_thread.quit)
+            self.api_worker.finished.connect(self.api_thread.quit)
 
-            self.worker_thread.start()
+            self.api_thread.start()
         else:
             QMessageBox.critical(self, "Error", "Please enter a code")
 
@@ -1746,6 +2152,13 @@ class MainWindow(QMainWindow):
             a0 (QCloseEvent | None): Qt close event
         """
         self.serial.close()
+        self.disk_widget.stop()
+
+        self.ingest_thread.quit()
+        self.ingest_thread.wait()  # the worker closes the store as it finishes
+
+        logging.info("Icon cache: %s", icon_cache.stats())
+
         event.accept()
 
 
@@ -1758,6 +2171,11 @@ if __name__ == "__main__":
     app.setApplicationName("6369 Scouting Data Transfer")
 
     settings = QSettings("Mercs", "ScoutingDataTransfer")
+    STARTUP_MARKS.append(("application", time.perf_counter()))
+
+    import qdarktheme  # pylint: disable=import-outside-toplevel
+
+    STARTUP_MARKS.append(("theme import", time.perf_counter()))
     with open("style.qss", "r", encoding="utf-8") as file:
         qdarktheme.setup_theme(additional_qss=file.read(), custom_colors={
         "[dark]": {
@@ -1765,5 +2183,6 @@ if __name__ == "__main__":
         }
     })
     qtawesome.dark(app)
+    STARTUP_MARKS.append(("theme", time.perf_counter()))
     win = MainWindow()
     sys.exit(app.exec())
@@ -0,0 +1,328 @@
+"""
+Write-behind mirroring of totals files to removable disks
+"""
+
+import os
+import time
+import logging
+import threading
+
+import pandas
+
+import constants
+import delta_sync
+import storage
+
+
+class DiskMirror:
+    """
+    Background copy of committed totals to mirror directories (e.g. a USB stick)
+
+    Submitting a frame never blocks on the disk. Pending updates to the same file
+    are coalesced, so only the newest frame is written and every row missing
+    from the file goes out in one append. A disk that fails or disappears is
+    retried after `retry_interval` seconds with a full rewrite, its updates stay
+    pending in the meantime.
+
+    Directories are written in parallel by `workers` threads, each directory by
+    one thread at a time with its own writer, so a slow disk only holds up
+    itself. `writer` is the template for the per-directory writers.
+
+    Full rewrites go through `delta_sync`, so a disk that comes back only gets
+    what it is missing. Its manifest is refreshed at least every
+    `manifest_interval` seconds while rows are appended.
+    """
+
+    def __init__(
+        self,
+        writer: storage.TotalsWriter | None = None,
+        retry_interval: float = constants.MIRROR_RETRY_INTERVAL,
+        workers: int = constants.MIRROR_WORKERS,
+        manifest_interval: float = constants.SYNC_MANIFEST_INTERVAL,
+    ) -> None:
+        self.writer = writer or storage.TotalsWriter(constants.TOTALS_COMPACT_INTERVAL)
+        self.retry_interval = retry_interval
+        self.manifest_interval = manifest_interval
+
+        self._cond = threading.Condition()
+        # (directory, form, event_id) -> (newest frame, needs full rewrite)
+        self._pending: dict[tuple[str, str, str], tuple[pandas.DataFrame, bool]] = {}
+        self._written: dict[tuple[str, str, str], int] = {}  # rows on disk
+        self._busy: dict[tuple[str, str, str], pandas.DataFrame] = {}
+        self._active: set[str] = set()  # directories being written
+        self._writers: dict[str, storage.TotalsWriter] = {}
+        self._manifests: dict[str, dict[str, dict]] = {}  # sync manifest per disk
+        self._manifest_at: dict[str, float] = {}  # last manifest write
+        self._unsaved: set[str] = set()  # manifests behind their files
+        self._retry_at: dict[str, float] = {}
+        self._errors: dict[str, str] = {}
+        self._dropped: set[str] = set()  # discarded while a write was in flight
+        self._closing = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f"disk-mirror-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(
+        self,
+        directory: str,
+        form: str,
+        event_id: str,
+        frame: pandas.DataFrame,
+        compact: bool = False,
+    ) -> None:
+        """Queue a form's frame to be written to a mirror directory
+
+        Args:
+            directory (str): Mirror directory
+            form (str): Form name
+            event_id (str): Event code
+            frame (pandas.DataFrame): Full frame for the form, must not be
+                                      modified afterwards
+            compact (bool, optional): Rewrite the whole file. Defaults to False.
+        """
+        key = (directory, form, event_id)
+        with self._cond:
+            self._dropped.discard(directory)
+            compact = compact or self._pending.get(key, (None, False))[1]
+            self._pending[key] = (frame, compact)
+            self._cond.notify()
+
+    def discard(self, directory: str) -> None:
+        """Drop pending updates and tracked state for a directory
+
+        Args:
+            directory (str): Mirror directory
+        """
+        with self._cond:
+            for key in [key for key in self._pending if key[0] == directory]:
+                del self._pending[key]
+            for key in [key for key in self._written if key[0] == directory]:
+                del self._written[key]
+            self._retry_at.pop(directory, None)
+            self._errors.pop(directory, None)
+            self._dropped.add(directory)
+            self._forget_manifest(directory)
+            writer = self._writers.pop(directory, None)
+        if writer:
+            writer.close()
+
+    def lag(self) -> dict[str, int]:
+        """
+        Rows not yet written, per mirror directory with pending updates
+        """
+        with self._cond:
+            lag: dict[str, int] = {}
+            for key, frame in [
+                *((key, frame) for key, (frame, _) in self._pending.items()),
+                *self._busy.items(),
+            ]:
+                rows = max(len(frame) - self._written.get(key, 0), 0)
+                lag[key[0]] = lag.get(key[0], 0) + rows
+            return lag
+
+    def set_durability(self, durability: storage.Durability) -> None:
+        """Set when mirrored files are fsynced
+
+        Args:
+            durability (storage.Durability): Durability policy
+        """
+        with self._cond:
+            writers = [self.writer, *self._writers.values()]
+        for writer in writers:
+            writer.set_durability(durability)
+
+    def errors(self) -> dict[str, str]:
+        """
+        Last error of each mirror directory that is waiting to be retried, or
+        whose last write failed unexpectedly
+        """
+        with self._cond:
+            return dict(self._errors)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Wait for pending updates to be written
+
+        Args:
+            timeout (float | None, optional): Seconds to wait. Defaults to None.
+
+        Returns:
+            bool: Whether everything was written
+        """
+        with self._cond:
+            return self._cond.wait_for(
+                lambda: not self._pending and not self._busy, timeout
+            )
+
+    def close(self, timeout: float | None = 5) -> None:
+        """Write what can be written, then stop the mirror thread
+
+        Args:
+            timeout (float | None, optional): Seconds to wait for pending updates.
+                                              Defaults to 5.
+        """
+        self.flush(timeout)
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        with self._cond:
+            writers = [self.writer, *self._writers.values()]
+            unsaved = [
+                directory for directory in self._unsaved if directory in self._writers
+            ]
+        for directory in unsaved:
+            try:
+                self._save_manifest(directory, self._writers[directory])
+            except OSError as error:
+                logging.warning("Failed to save manifest on %s: %s", directory, error)
+        for writer in writers:
+            writer.close()
+
+    def _next(self) -> tuple[str, dict] | None:
+        # pending updates of one idle directory that isn't waiting for a retry
+        now = time.monotonic()
+        for key in self._pending:
+            directory = key[0]
+            if directory not in self._active and (
+                self._retry_at.get(directory, 0) <= now
+            ):
+                return directory, {
+                    key: value
+                    for key, value in self._pending.items()
+                    if key[0] == directory
+                }
+        return None
+
+    def _writer(self, directory: str) -> storage.TotalsWriter:
+        with self._cond:
+            if directory not in self._writers:
+                self._writers[directory] = storage.TotalsWriter(
+                    self.writer.compact_interval,
+                    self.writer.durability,
+                    self.writer.group_size,
+                    self.writer.group_interval,
+                )
+            return self._writers[directory]
+
+    def _manifest(self, directory: str) -> dict[str, dict]:
+        with self._cond:
+            files = self._manifests.get(directory)
+        if files is None:
+            files = delta_sync.read_manifest(directory)
+            with self._cond:
+                self._manifests[directory] = files
+        return files
+
+    def _save_manifest(self, directory: str, writer: storage.TotalsWriter) -> None:
+        with self._cond:
+            files = dict(self._manifests.get(directory, {}))
+            self._unsaved.discard(directory)
+            self._manifest_at[directory] = time.monotonic()
+        delta_sync.write_manifest(directory, files, writer.durability)
+
+    def _forget_manifest(self, directory: str) -> None:
+        self._manifests.pop(directory, None)
+        self._manifest_at.pop(directory, None)
+        self._unsaved.discard(directory)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closing and not (ready := self._next()):
+                    retry = [
+                        retry_at
+                        for directory, retry_at in self._retry_at.items()
+                        if directory not in self._active
+                    ]
+                    self._cond.wait(
+                        max(min(retry) - time.monotonic(), 0.05) if retry else None
+                    )
+                if self._closing:
+                    return
+                directory, updates = ready
+                for key, (frame, _) in updates.items():
+                    del self._pending[key]
+                    self._busy[key] = frame
+                self._active.add(directory)
+
+            try:
+                for key, (frame, compact) in updates.items():
+                    try:
+                        self._write(key, frame, compact)
+                    except Exception as error:  # pylint: disable=broad-exception-caught
+                        # keep the worker alive, the next write is a full rewrite
+                        logging.exception("Mirror write of %s failed", key)
+                        self._writer(directory).forget(directory)
+                        with self._cond:
+                            self._forget_manifest(directory)
+                            if directory not in self._dropped:
+                                self._errors[directory] = repr(error)
+            finally:
+                with self._cond:
+                    for key in updates:
+                        self._busy.pop(key, None)
+                    self._active.discard(directory)
+                    self._cond.notify_all()
+
+    def _write(
+        self, key: tuple[str, str, str], frame: pandas.DataFrame, compact: bool
+    ) -> None:
+        directory, form, event_id = key
+        writer = self._writer(directory)
+        try:
+            if not os.path.isdir(directory):
+                # don't recreate the mountpoint of a pulled disk on the root fs
+                raise FileNotFoundError(f"{directory} is not available")
+
+            files = self._manifest(directory)
+            if compact:
+                result = delta_sync.sync(
+                    writer, files, directory, form, event_id, frame
+                )
+                logging.info(
+                    "Synced %s %s to %s: %s blocks, %s bytes%s",
+                    event_id,
+                    form,
+                    directory,
+                    result.blocks,
+                    result.written,
+                    " (full rewrite)" if result.full else "",
+                )
+                self._save_manifest(directory, writer)
+            else:
+                writer.append(directory, form, event_id, frame)
+                delta_sync.update(files, directory, form, event_id, frame)
+                with self._cond:
+                    self._unsaved.add(directory)
+                    due = (
+                        time.monotonic() - self._manifest_at.get(directory, 0)
+                        >= self.manifest_interval
+                    )
+                if due:
+                    self._save_manifest(directory, writer)
+        except OSError as error:
+            # whatever made it to the file is unknown, rewrite it on retry
+            writer.forget(directory)
+            with self._cond:
+                self._forget_manifest(directory)
+                if directory in self._dropped:
+                    return
+                if self._errors.get(directory) != str(error):
+                    logging.warning("Mirror write to %s failed: %s", directory, error)
+                self._pending.setdefault(key, (frame, True))
+                self._retry_at[directory] = time.monotonic() + self.retry_interval
+                self._errors[directory] = str(error)
+                self._written.pop(key, None)
+            return
+
+        with self._cond:
+            if directory in self._dropped:
+                return
+            self._written[key] = len(frame)
+            self._retry_at.pop(directory, None)
+            if self._errors.pop(directory, None):
+                logging.info("Mirror writes to %s resumed", directory)
@@ -0,0 +1,118 @@
+"""
+Synthetic scan payloads for benchmarks and offline testing
+"""
+
+import random
+import typing
+
+import schema
+
+SCOUTERS: typing.Final = ["red1", "red2", "red3", "blue1", "blue2", "blue3"]
+
+CATEGORY_CHOICES: typing.Final = {
+    "scouters": ["alex", "sam", "jordan", "riley", "casey"],
+    "drivebase": ["swerve", "tank", "mecanum", "other"],
+    "climber": ["yes", "no"],
+    "scorePref": ["speaker", "amp", "trap", "none"],
+    "autonPrefStart": ["amp", "center", "source"],
+    "startingPosition": ["amp", "center", "source"],
+    "autonPreload": ["yes", "no"],
+    "endgameClimbPos": ["none", "left", "center", "right"],
+    "endgameDidTheyTrap": ["yes", "no"],
+    "endgameDidTheyHarmony": ["yes", "no"],
+    "endgameCoOp": ["yes", "no"],
+    "endgameDidTheyGetACard": ["none", "yellow", "red"],
+}
+
+WORDS: typing.Final = [
+    "fast",
+    "slow",
+    "defense",
+    "shot",
+    "amp",
+    "speaker",
+    "climb",
+    "tipped",
+    "dropped",
+    "note",
+    "good",
+    "driver",
+    "intake",
+    "jammed",
+]
+
+
+class ScanGenerator:
+    """
+    Deterministic generator of realistic pit, qual and playoff payloads
+
+    Payload `n` of a form always has a distinct dedupe key: pit scans use team
+    n + 1, match scans put six distinct teams from the event pool in each match.
+    """
+
+    def __init__(self, seed: int = 6369, event: str = "2024bench", teams: int = 60):
+        self.seed = seed
+        self.event = event
+        self.teams = random.Random(seed).sample(range(1, 10000), teams)
+
+    def payload(self, form: str, n: int) -> str:
+        """Generate one payload
+
+        Args:
+            form (str): Form name
+            n (int): Payload number within the form
+
+        Returns:
+            str: "||"-separated payload
+        """
+        rng = random.Random(f"{self.seed}:{form}:{n}")
+
+        if form == "pit":
+            keys = {"teamNumber": f"frc{n + 1}"}
+        else:
+            match = n // len(SCOUTERS) + 1
+            lineup = random.Random(f"{self.seed}:{form}:match{match}").sample(
+                self.teams, len(SCOUTERS)
+            )
+            keys = {
+                "teamNumber": f"frc{lineup[n % len(SCOUTERS)]}",
+                "matchNumber": str(match),
+                "scouter": SCOUTERS[n % len(SCOUTERS)],
+            }
+        keys["form"] = form
+        keys["event"] = self.event
+
+        fields = []
+        for column, dtype in schema.dtypes(form).items():
+            if column in keys:
+                fields.append(keys[column])
+            elif dtype == schema.INT:
+                fields.append(str(rng.randint(0, 12)))
+            elif dtype == schema.FLOAT:
+                fields.append(str(round(rng.uniform(0, 5), 1)))
+            elif dtype == schema.BOOL:
+                fields.append(rng.choice(["true", "false"]))
+            elif dtype == schema.CATEGORY:
+                fields.append(rng.choice(CATEGORY_CHOICES.get(column, ["yes", "no"])))
+            else:
+                fields.append(" ".join(rng.choices(WORDS, k=rng.randint(0, 8))))
+        return "||".join(fields)
+
+    def payloads(self, form: str, count: int, start: int = 0) -> list[str]:
+        """Generate consecutive payloads
+
+        Args:
+            form (str): Form name
+            count (int): Number of payloads
+            start (int, optional): First payload number. Defaults to 0.
+
+        Returns:
+            list[str]: Payloads
+        """
+        return [self.payload(form, n) for n in range(start, start + count)]
+
+
+if __name__ == "__main__":
+    generator = ScanGenerator()
+    for scan_form in schema.HEADERS:
+        print(generator.payload(scan_form, 0))
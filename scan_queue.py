@@ -0,0 +1,111 @@
+"""
+Bounded FIFO queue for raw scan payloads
+"""
+
+import os
+import collections
+import logging
+import threading
+
+
+class ScanQueue:
+    """
+    Bounded FIFO of raw scan payloads
+
+    Up to `maxsize` payloads are held in memory. Once the queue is full further
+    payloads are spilled to a file on disk instead of being dropped, and are
+    pulled back in order as the queue drains. Payloads left in the spill file
+    (e.g. after a crash) are picked up again when the queue is created.
+    """
+
+    def __init__(self, maxsize: int, spill_path: str | None = None) -> None:
+        self.maxsize = max(maxsize, 1)
+        self.spill_path = spill_path
+
+        self._lock = threading.Lock()
+        self._queue: collections.deque[str] = collections.deque()
+        self._spilled = 0
+
+        if self.spill_path and os.path.isfile(self.spill_path):
+            with open(self.spill_path, "r", encoding="utf-8") as file:
+                self._spilled = sum(1 for line in file if line.strip())
+            if self._spilled:
+                logging.warning(
+                    "Recovered %s spilled scans from %s", self._spilled, self.spill_path
+                )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._queue) + self._spilled
+
+    @property
+    def spilled(self) -> int:
+        """
+        Number of payloads currently held in the spill file
+        """
+        with self._lock:
+            return self._spilled
+
+    def set_maxsize(self, maxsize: int) -> None:
+        """Change the in-memory bound
+
+        Args:
+            maxsize (int): New bound, payloads over it stay queued
+        """
+        with self._lock:
+            self.maxsize = max(maxsize, 1)
+
+    def put(self, payload: str) -> bool:
+        """Add a payload to the back of the queue
+
+        Args:
+            payload (str): Raw scan payload
+
+        Returns:
+            bool: True if held in memory, False if it was spilled to disk
+        """
+        payload = payload.strip("\r\n")
+        with self._lock:
+            # once anything is spilled, keep spilling to preserve ordering
+            if len(self._queue) < self.maxsize and not self._spilled:
+                self._queue.append(payload)
+                return True
+
+            if not self.spill_path:
+                # nowhere to spill to, grow past the bound rather than lose data
+                logging.warning("Scan queue over capacity with no spill file")
+                self._queue.append(payload)
+                return True
+
+            with open(self.spill_path, "a", encoding="utf-8") as file:
+                file.write(payload + "\n")
+            self._spilled += 1
+            logging.warning("Scan queue full, spilled payload to %s", self.spill_path)
+            return False
+
+    def get(self) -> str | None:
+        """Take the payload at the front of the queue
+
+        Returns:
+            str | None: Payload, None if the queue is empty
+        """
+        with self._lock:
+            if not self._queue and self._spilled:
+                self._refill()
+            if not self._queue:
+                return None
+            return self._queue.popleft()
+
+    def _refill(self) -> None:
+        with open(self.spill_path, "r", encoding="utf-8") as file:
+            lines = [line.rstrip("\r\n") for line in file if line.strip()]
+
+        self._queue.extend(lines[: self.maxsize])
+        remaining = lines[self.maxsize :]
+
+        if remaining:
+            with open(self.spill_path, "w", encoding="utf-8") as file:
+                file.writelines(line + "\n" for line in remaining)
+        else:
+            os.remove(self.spill_path)
+        self._spilled = len(remaining)
@@ -0,0 +1,477 @@
+"""
+Typed column schema for pit, qual and playoff data
+"""
+
+import typing
+
+import numpy
+import pandas
+
+import constants
+
+INT: typing.Final = "Int16"
+FLOAT: typing.Final = "Float32"
+BOOL: typing.Final = "boolean"
+CATEGORY: typing.Final = "category"
+STRING: typing.Final = "string"
+
+HEADERS: typing.Final = {
+    "pit": constants.PIT_DATA_HEADER,
+    "qual": constants.QUAL_DATA_HEADER,
+    "playoff": constants.PLAYOFF_DATA_HEADER,
+}
+
+# columns not listed here are stored as strings
+COLUMN_TYPES: typing.Final = {
+    # shared
+    "form": CATEGORY,
+    "event": CATEGORY,
+    "teamNumber": CATEGORY,
+    "hasAuton": BOOL,
+    # pit
+    "scouters": CATEGORY,
+    "botLength": FLOAT,
+    "botWidth": FLOAT,
+    "botHeight": FLOAT,
+    "botWeight": FLOAT,
+    "drivebase": CATEGORY,
+    "climber": CATEGORY,
+    "isKitbot": BOOL,
+    "intakeInBumper": BOOL,
+    "speakerScore": BOOL,
+    "ampScore": BOOL,
+    "trapScore": BOOL,
+    "scorePref": CATEGORY,
+    "groundPickup": BOOL,
+    "sourcePickup": BOOL,
+    "turretShoot": BOOL,
+    "extendShoot": BOOL,
+    "hasBlocker": BOOL,
+    "hasAutoAim": BOOL,
+    "autonSpeakerNotes": INT,
+    "autonAmpNotes": INT,
+    "autonConsistency": FLOAT,
+    "autonVersatility": FLOAT,
+    "autonRoutes": INT,
+    "autonPrefStart": CATEGORY,
+    "repairability": FLOAT,
+    "maneuverability": FLOAT,
+    # qual / playoff
+    "matchNumber": INT,
+    "scouter": CATEGORY,
+    "startingPosition": CATEGORY,
+    "autonLeave": BOOL,
+    "autonCrossCenter": BOOL,
+    "autonAStop": BOOL,
+    "autonPreload": CATEGORY,
+    "autonSpeakerNotesScored": INT,
+    "autonSpeakerNotesMissed": INT,
+    "autonAmpNotesScored": INT,
+    "autonAmpNotesMissed": INT,
+    "teleopFloorPickup": BOOL,
+    "teleopSourcePickup": BOOL,
+    "teleopAmpScored": INT,
+    "teleopAmpMissed": INT,
+    "teleopSpeakerScored": INT,
+    "teleopSpeakerMissed": INT,
+    "teleopDroppedNotes": INT,
+    "teleopFedNotes": INT,
+    "teleopAmps": INT,
+    "endgameClimbSpeed": FLOAT,
+    "endgameClimbPos": CATEGORY,
+    "endgameDidTheyTrap": CATEGORY,
+    "endgameDidTheyHarmony": CATEGORY,
+    "endgameDefenseBot": BOOL,
+    "endgameDriverRating": FLOAT,
+    "endgameDefenseRating": FLOAT,
+    "endgameHighnote": BOOL,
+    "endgameCoOp": CATEGORY,
+    "endgameDidTheyGetACard": CATEGORY,
+    "endgameDidTheyNoShow": BOOL,
+}
+
+_INT_RANGE: typing.Final = (-(2**15), 2**15 - 1)
+_FLOAT_MAX: typing.Final = 3.4028234663852886e38  # largest finite float32
+_BOOL_VALUES: typing.Final = {"true": True, "false": False, "1": True, "0": False}
+
+
+class SchemaError(ValueError):
+    """
+    A value could not be converted to its column's type
+    """
+
+    def __init__(self, column: str, dtype: str, value) -> None:
+        super().__init__(f"{column}: can't convert {value!r} to {dtype}")
+        self.column = column
+        self.dtype = dtype
+        self.value = value
+
+
+_DTYPES: typing.Final = {
+    form: {column: COLUMN_TYPES.get(column, STRING) for column in header}
+    for form, header in HEADERS.items()
+}
+_SEAL_ROWS: typing.Final = 1024  # FrameBuffer text rows converted per view, at most
+_MASKED: typing.Final = {  # numpy storage and array type of nullable columns
+    INT: (numpy.int16, pandas.arrays.IntegerArray),
+    FLOAT: (numpy.float32, pandas.arrays.FloatingArray),
+    BOOL: (numpy.bool_, pandas.arrays.BooleanArray),
+}
+
+
+def dtypes(form: str) -> dict[str, str]:
+    """Get the column types of a form
+
+    Args:
+        form (str): Form name
+
+    Returns:
+        dict[str, str]: pandas dtype for every column, in header order. Shared,
+                        don't modify it.
+    """
+    return _DTYPES[form]
+
+
+def empty_frame(form: str) -> pandas.DataFrame:
+    """Create an empty, typed frame for a form
+
+    Args:
+        form (str): Form name
+
+    Returns:
+        pandas.DataFrame: Frame with every column and no rows
+    """
+    return pandas.DataFrame(
+        {column: pandas.Series(dtype=dtype) for column, dtype in dtypes(form).items()}
+    )
+
+
+def from_values(rows: list[list], form: str) -> pandas.DataFrame:
+    """Build a typed frame from decoder output without re-parsing it
+
+    Values are only checked against the range of numeric columns.
+
+    Args:
+        rows (list[list]): Rows of values already of their column's type
+        form (str): Form name
+
+    Raises:
+        SchemaError: A number is out of its column's range
+
+    Returns:
+        pandas.DataFrame: Typed frame
+    """
+    columns = list(zip(*rows)) if rows else [()] * len(HEADERS[form])
+    data = {}
+    for (column, dtype), values in zip(dtypes(form).items(), columns):
+        _check_range(column, dtype, values)
+        if dtype == CATEGORY:
+            data[column] = pandas.Categorical(pandas.array(values, dtype=STRING))
+        else:
+            data[column] = pandas.array(values, dtype=dtype)
+    return pandas.DataFrame(data)
+
+
+class FrameBuffer:
+    """
+    A form's typed frame that grows a few rows at a time
+
+    Columns are kept in preallocated arrays that double when full and `frame`
+    is a view of their filled part, so appending a scan doesn't copy the rows
+    before it the way `concat` does. Category codes are looked up per value,
+    new values are added to the column's categories without a union.
+
+    `frame` starts out as the typed rows the buffer was created with, if any
+    (e.g. a loaded totals file). Frames from `frame` and `append` share the
+    arrays, never modify them. Rows they hold are never written again.
+    """
+
+    def __init__(self, form: str, frame: pandas.DataFrame | None = None) -> None:
+        self.form = form
+        if frame is None:
+            frame = empty_frame(form)
+        self._length = len(frame)
+        capacity = max(self._length * 2, 256)
+        self._columns = [
+            _BufferColumn(column, dtype, frame[column], capacity)
+            for column, dtype in dtypes(form).items()
+        ]
+        if not frame.index.equals(pandas.RangeIndex(self._length)):
+            frame = frame.reset_index(drop=True)
+        self._frame: pandas.DataFrame | None = frame
+
+    def __len__(self) -> int:
+        return self._length
+
+    @property
+    def frame(self) -> pandas.DataFrame:
+        """
+        Typed frame of every row, with a RangeIndex
+        """
+        if self._frame is None:
+            self._frame = pandas.DataFrame(
+                {column.name: column.view(self._length) for column in self._columns},
+                copy=False,
+            )
+        return self._frame
+
+    def append(self, rows: list[list]) -> pandas.DataFrame:
+        """Append decoder output
+
+        Args:
+            rows (list[list]): Rows of values already of their column's type
+
+        Raises:
+            SchemaError: A number is out of its column's range, nothing is
+                         appended then
+
+        Returns:
+            pandas.DataFrame: The new `frame`
+        """
+        for index, column in enumerate(self._columns):
+            _check_range(column.name, column.dtype, [row[index] for row in rows])
+
+        length = self._length + len(rows)
+        for column in self._columns:
+            column.reserve(length)
+        for offset, row in enumerate(rows, self._length):
+            for column, value in zip(self._columns, row):
+                column.set(offset, value)
+
+        self._length = length
+        self._frame = None
+        return self.frame
+
+    def truncate(self, length: int) -> None:
+        """Drop rows from the end, e.g. after they failed to persist
+
+        Args:
+            length (int): Rows to keep
+        """
+        if length < self._length:
+            self._length = length
+            self._frame = None
+
+
+class _BufferColumn:
+    # storage of one `FrameBuffer` column: values (or category codes) and a
+    # missing mask for nullable types, python objects for everything else
+
+    def __init__(
+        self, name: str, dtype: str, series: pandas.Series, capacity: int
+    ) -> None:
+        self.name = name
+        # columns loaded untyped (see `apply`) stay as they are
+        self.dtype = dtype if series.dtype == dtype else STRING
+        self.series_dtype = series.dtype
+        length = len(series)
+
+        if self.dtype in _MASKED:
+            storage = _MASKED[self.dtype][0]
+            self.values = numpy.zeros(capacity, storage)
+            self.values[:length] = series.to_numpy(storage, na_value=0)
+            self.mask = numpy.ones(capacity, numpy.bool_)
+            self.mask[:length] = series.isna().to_numpy()
+        elif self.dtype == CATEGORY:
+            self.values = numpy.full(capacity, -1, numpy.int32)
+            self.values[:length] = series.cat.codes.to_numpy()
+            self.codes = {
+                value: code for code, value in enumerate(series.cat.categories)
+            }
+            if not self.codes:  # same categories type as `from_values`
+                self.series_dtype = pandas.CategoricalDtype(
+                    pandas.Index([], dtype=STRING)
+                )
+        else:
+            self.values = numpy.full(capacity, None, object)
+            self.values[:length] = series.to_numpy(object, na_value=None)
+            # converted array of the first rows, so a view only converts the rest
+            self.sealed = series.array
+            self.sealed_length = length
+
+    def reserve(self, length: int) -> None:
+        if length <= len(self.values):
+            return
+        capacity = max(length, len(self.values) * 2)
+        self.values = _grow(self.values, capacity, -1 if self.dtype == CATEGORY else 0)
+        if self.dtype in _MASKED:
+            self.mask = _grow(self.mask, capacity, True)
+
+    def set(self, index: int, value) -> None:
+        if self.dtype in _MASKED:
+            self.mask[index] = value is None
+            self.values[index] = 0 if value is None else value
+        elif self.dtype == CATEGORY:
+            if value is None:
+                self.values[index] = -1
+                return
+            if value not in self.codes:
+                self.codes[value] = len(self.codes)
+                self.series_dtype = pandas.CategoricalDtype(
+                    self.series_dtype.categories.append(
+                        pandas.Index([value], dtype=self.series_dtype.categories.dtype)
+                    )
+                )
+            self.values[index] = self.codes[value]
+        elif self.series_dtype == STRING and value is not None:
+            self.values[index] = str(value)
+        else:
+            self.values[index] = value
+
+    def view(self, length: int):
+        if self.dtype in _MASKED:
+            return _MASKED[self.dtype][1](self.values[:length], self.mask[:length])
+        if self.dtype == CATEGORY:
+            return pandas.Categorical.from_codes(
+                self.values[:length], dtype=self.series_dtype, validate=False
+            )
+        if not 0 <= length - self.sealed_length < _SEAL_ROWS:
+            self.sealed = pandas.array(self.values[:length], dtype=self.series_dtype)
+            self.sealed_length = length
+        if length == self.sealed_length:
+            return self.sealed
+        tail = pandas.array(
+            self.values[self.sealed_length : length], dtype=self.series_dtype
+        )
+        return type(self.sealed)._concat_same_type([self.sealed, tail])
+
+
+def _grow(values: numpy.ndarray, capacity: int, fill) -> numpy.ndarray:
+    grown = numpy.full(capacity, fill, values.dtype)
+    grown[: len(values)] = values
+    return grown
+
+
+def _check_range(column: str, dtype: str, values) -> None:
+    if dtype == INT:
+        low, high = _INT_RANGE
+    elif dtype == FLOAT:
+        low, high = -_FLOAT_MAX, _FLOAT_MAX
+    else:
+        return
+    numbers = [value for value in values if isinstance(value, (int, float))]
+    if numbers and not low <= min(numbers) <= max(numbers) <= high:
+        raise SchemaError(
+            column, dtype, next(value for value in numbers if not low <= value <= high)
+        )
+
+
+def read_csv(path: str, form: str) -> pandas.DataFrame:
+    """Load a totals file with the form's column types
+
+    Args:
+        path (str): Path to CSV file
+        form (str): Form name
+
+    Returns:
+        pandas.DataFrame: Typed frame
+    """
+    return apply(pandas.read_csv(path, dtype=str, keep_default_na=False), form)
+
+
+def apply(data: pandas.DataFrame, form: str, strict: bool = False) -> pandas.DataFrame:
+    """Convert a frame's columns to the form's types
+
+    Args:
+        data (pandas.DataFrame): Frame to convert
+        form (str): Form name
+        strict (bool, optional): Raise on values that don't fit their column,
+                                 otherwise the column is kept as strings.
+                                 Defaults to False.
+
+    Raises:
+        SchemaError: A value does not fit its column's type (strict only)
+
+    Returns:
+        pandas.DataFrame: Converted frame
+    """
+    columns = {}
+    for column in data.columns:
+        dtype = COLUMN_TYPES.get(column, STRING)
+        try:
+            columns[column] = convert(data[column], dtype, column)
+        except SchemaError:
+            if strict:
+                raise
+            columns[column] = convert(data[column], STRING, column)
+    return pandas.DataFrame(columns, index=data.index)
+
+
+def convert(series: pandas.Series, dtype: str, column: str = "") -> pandas.Series:
+    """Convert a column to a schema type
+
+    Args:
+        series (pandas.Series): Raw column
+        dtype (str): Schema type
+        column (str, optional): Column name for errors. Defaults to "".
+
+    Raises:
+        SchemaError: A value does not fit the type
+
+    Returns:
+        pandas.Series: Converted column
+    """
+    # empty strings are what missing values turn into after a CSV round trip
+    series = series.mask(series.astype("string") == "")
+
+    if dtype == BOOL:
+        text = series.astype("string").str.strip().str.lower()
+        result = text.map(_BOOL_VALUES).astype(BOOL)
+    elif dtype in (INT, FLOAT):
+        result = pandas.to_numeric(
+            series.where(~series.map(lambda x: isinstance(x, bool))), errors="coerce"
+        )
+        if dtype == INT:
+            bad = result.notna() & (
+                (result % 1 != 0) | (result < _INT_RANGE[0]) | (result > _INT_RANGE[1])
+            )
+            if bad.any():
+                raise SchemaError(column, dtype, series[bad].iloc[0])
+        result = result.astype(dtype)
+    elif dtype == CATEGORY:
+        return series.astype("string").astype(CATEGORY)
+    else:
+        return series.astype(STRING)
+
+    bad = series.notna() & result.isna()
+    if bad.any():
+        raise SchemaError(column, dtype, series[bad].iloc[0])
+    return result
+
+
+def concat(data: pandas.DataFrame, rows: pandas.DataFrame) -> pandas.DataFrame:
+    """Append typed rows to a typed frame without losing categorical columns
+
+    Args:
+        data (pandas.DataFrame): Existing frame
+        rows (pandas.DataFrame): New rows with the same columns
+
+    Returns:
+        pandas.DataFrame: Combined frame
+    """
+    if data.empty:
+        return rows.reset_index(drop=True)
+    if rows.empty:
+        return data
+
+    # only touch columns whose categories differ, everything else is concatenated as is
+    data_updates = {}
+    row_dtypes = {}
+    for column in data.columns:
+        left, right = data[column].dtype, rows[column].dtype
+        if (
+            isinstance(left, pandas.CategoricalDtype)
+            and isinstance(right, pandas.CategoricalDtype)
+            and left != right
+        ):
+            new = right.categories.difference(left.categories)
+            if len(new):
+                data_updates[column] = data[column].cat.add_categories(new)
+                left = data_updates[column].dtype
+            row_dtypes[column] = left
+
+    if data_updates:
+        data = data.assign(**data_updates)
+    if row_dtypes:
+        rows = rows.astype(row_dtypes)
+    return pandas.concat([data, rows], ignore_index=True)
@@ -0,0 +1,82 @@
+"""
+Split a serial byte stream into scan records
+"""
+
+import logging
+
+
+class SerialFramer:
+    """
+    Byte-level framing for newline-terminated scan records
+
+    Chunks are collected in a bytearray and split on the terminator. Every
+    complete record in a chunk is returned, partial tails are kept for the next
+    chunk, and only complete records are decoded so multi-byte characters split
+    across chunks survive. Records longer than `max_frame` bytes are dropped.
+    """
+
+    def __init__(self, max_frame: int, terminator: bytes = b"\n") -> None:
+        self.max_frame = max_frame
+        self.terminator = terminator
+
+        self.oversized = 0  # dropped frames
+
+        self._buffer = bytearray()
+        self._scanned = 0  # bytes already searched for a terminator
+        self._discarding = False  # dropping the rest of an oversized frame
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def feed(self, chunk: bytes) -> list[str]:
+        """Add received bytes
+
+        Args:
+            chunk (bytes): Bytes as read from the serial port
+
+        Returns:
+            list[str]: Decoded records completed by this chunk
+        """
+        self._buffer += chunk
+
+        records = []
+        start = 0
+        while True:
+            end = self._buffer.find(self.terminator, max(start, self._scanned))
+            if end < 0:
+                break
+
+            frame = bytes(self._buffer[start:end]).rstrip(b"\r")
+            start = end + len(self.terminator)
+
+            if self._discarding:
+                self._discarding = False
+            elif len(frame) > self.max_frame:
+                self._drop(len(frame))
+            elif frame:
+                records.append(frame.decode("utf-8", errors="replace"))
+
+        del self._buffer[:start]
+        self._scanned = len(self._buffer)
+
+        if len(self._buffer) > self.max_frame:
+            # no terminator in sight, drop what we have and skip to the next one
+            if not self._discarding:
+                self._drop(len(self._buffer))
+            self._discarding = True
+            self._buffer.clear()
+            self._scanned = 0
+
+        return records
+
+    def reset(self) -> None:
+        """
+        Drop any partial record (e.g. when the port is reopened)
+        """
+        self._buffer.clear()
+        self._scanned = 0
+        self._discarding = False
+
+    def _drop(self, size: int) -> None:
+        self.oversized += 1
+        logging.error("Dropped oversized serial frame (%s+ bytes)", size)
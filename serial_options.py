@@ -0,0 +1,34 @@
+"""
+Qt serial port settings offered in the connection panel
+"""
+
+import typing
+
+from PySide6.QtSerialPort import QSerialPort
+
+DATA_BITS: typing.Final = {
+    "5 Data Bits": QSerialPort.DataBits.Data5,
+    "6 Data Bits": QSerialPort.DataBits.Data6,
+    "7 Data Bits": QSerialPort.DataBits.Data7,
+    "8 Data Bits": QSerialPort.DataBits.Data8,
+}
+
+STOP_BITS: typing.Final = {
+    "1 Stop Bits": QSerialPort.StopBits.OneStop,
+    "1.5 Stop Bits": QSerialPort.StopBits.OneAndHalfStop,
+    "2 Stop Bits": QSerialPort.StopBits.TwoStop,
+}
+
+PARITY: typing.Final = {
+    "No Parity": QSerialPort.Parity.NoParity,
+    "Even Parity": QSerialPort.Parity.EvenParity,
+    "Odd Parity": QSerialPort.Parity.OddParity,
+    "Mark Parity": QSerialPort.Parity.MarkParity,
+    "Space Parity": QSerialPort.Parity.SpaceParity,
+}
+
+FLOW_CONTROL: typing.Final = {
+    "No Flow Control": QSerialPort.FlowControl.NoFlowControl,
+    "Software FC": QSerialPort.FlowControl.SoftwareControl,
+    "Hardware FC": QSerialPort.FlowControl.HardwareControl,
+}
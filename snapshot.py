@@ -0,0 +1,160 @@
+"""
+Typed Arrow IPC snapshots of totals files
+
+A snapshot sits next to its totals file as {event_id}_{form}_total.arrow and
+records how much of the CSV it covers, so a reload memory-maps the snapshot and
+only parses rows appended to the CSV since. The files can be opened directly
+from notebooks with `pandas.read_feather` or `pyarrow.feather.read_table`.
+
+Snapshots need pyarrow, without it every function here is a no-op.
+"""
+
+import io
+import os
+import hashlib
+import logging
+
+import pandas
+
+import schema
+import storage
+
+try:
+    import pyarrow
+    from pyarrow import feather
+except ImportError:  # optional, totals are always loadable from CSV
+    pyarrow = None
+
+CSV_SIZE_KEY = b"scouting.csv_size"
+CSV_CHECK_KEY = b"scouting.csv_check"
+CHECK_BYTES = 4096  # CSV bytes before the covered end that must be unchanged
+MAX_TAIL = 0.5  # largest uncovered CSV tail, as a fraction of the covered bytes
+
+
+def available() -> bool:
+    """
+    Whether snapshots can be read and written
+    """
+    return pyarrow is not None
+
+
+def snapshot_path(directory: str, form: str, event_id: str) -> str:
+    """Get the path of a snapshot
+
+    Args:
+        directory (str): Transfer directory or disk mountpoint
+        form (str): Form name
+        event_id (str): Event code
+
+    Returns:
+        str: Path to {event_id}_{form}_total.arrow
+    """
+    return os.path.join(directory, form, f"{event_id}_{form}_total.arrow")
+
+
+def _check(file, size: int) -> bytes:
+    file.seek(max(size - CHECK_BYTES, 0))
+    return hashlib.sha1(file.read(min(size, CHECK_BYTES))).hexdigest().encode()
+
+
+def write(directory: str, form: str, event_id: str, frame: pandas.DataFrame) -> bool:
+    """Snapshot a form, the totals file must hold exactly the frame's rows
+
+    Args:
+        directory (str): Transfer directory or disk mountpoint
+        form (str): Form name
+        event_id (str): Event code
+        frame (pandas.DataFrame): Full typed frame for the form
+
+    Returns:
+        bool: Whether a snapshot was written
+    """
+    if not available():
+        return False
+
+    csv_path = storage.totals_path(directory, form, event_id)
+    path = snapshot_path(directory, form, event_id)
+    try:
+        with open(csv_path, "rb") as file:
+            size = file.seek(0, os.SEEK_END)
+            check = _check(file, size)
+
+        table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+        table = table.replace_schema_metadata(
+            {
+                **table.schema.metadata,
+                CSV_SIZE_KEY: str(size).encode(),
+                CSV_CHECK_KEY: check,
+            }
+        )
+        # uncompressed so it can be memory-mapped on load
+        feather.write_feather(table, f"{path}.tmp", compression="uncompressed")
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        logging.exception("Failed to write snapshot %s", path)
+        return False
+
+    logging.info("Wrote snapshot %s (%s rows)", path, len(frame))
+    return True
+
+
+def read(directory: str, form: str, event_id: str) -> pandas.DataFrame | None:
+    """Load a form from its snapshot plus any rows appended to the CSV since
+
+    Args:
+        directory (str): Transfer directory or disk mountpoint
+        form (str): Form name
+        event_id (str): Event code
+
+    Returns:
+        pandas.DataFrame | None: Typed frame, None if there is no usable snapshot
+                                 or the CSV tail is too large to be worth it
+    """
+    path = snapshot_path(directory, form, event_id)
+    if not available() or not os.path.exists(path):
+        return None
+
+    try:
+        table = feather.read_table(path, memory_map=True)
+        metadata = table.schema.metadata or {}
+        if CSV_SIZE_KEY not in metadata or table.column_names != schema.HEADERS[form]:
+            return None
+        size = int(metadata[CSV_SIZE_KEY])
+
+        with open(storage.totals_path(directory, form, event_id), "rb") as file:
+            end = file.seek(0, os.SEEK_END)
+            if end < size or _check(file, size) != metadata.get(CSV_CHECK_KEY):
+                logging.info("Snapshot %s is out of date", path)
+                return None
+            if end - size > size * MAX_TAIL:
+                # parsing the tail and joining it costs more than the whole CSV
+                logging.info("Snapshot %s is too far behind, reading CSV", path)
+                return None
+            file.seek(size)
+            tail = file.read()
+    except (OSError, ValueError, pyarrow.ArrowException):
+        logging.exception("Failed to read snapshot %s", path)
+        return None
+
+    frame = table.to_pandas()
+    for column in frame.columns:
+        if isinstance(frame[column].dtype, pandas.CategoricalDtype):
+            # arrow hands categories back as object, the schema uses strings
+            frame[column] = frame[column].cat.rename_categories(
+                pandas.Index(frame[column].cat.categories, dtype=schema.STRING)
+            )
+
+    if tail.strip():
+        rows = schema.apply(
+            pandas.read_csv(
+                io.BytesIO(tail),
+                header=None,
+                names=schema.HEADERS[form],
+                dtype=str,
+                keep_default_na=False,
+            ),
+            form,
+        )
+        rows.index = pandas.RangeIndex(len(frame), len(frame) + len(rows))
+        frame = schema.concat(frame, rows)
+    return frame
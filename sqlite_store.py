@@ -0,0 +1,259 @@
+"""
+SQLite storage of scans, one WAL-mode database per event
+"""
+
+import os
+import logging
+import sqlite3
+import threading
+
+import pandas
+
+import key_index
+import schema
+import storage
+
+SYNCHRONOUS: dict[storage.Durability, str] = {
+    storage.Durability.SYNC: "FULL",
+    storage.Durability.GROUP: "NORMAL",  # WAL commits are durable at checkpoints
+    storage.Durability.BUFFERED: "OFF",
+}
+
+# bookkeeping columns, prefixed so they can't clash with form columns
+TEAM_COLUMN = "_team"
+MATCH_COLUMN = "_match"
+REPEAT_COLUMN = "_repeat"  # number of earlier scans with the same key
+
+
+def database_path(directory: str, event_id: str) -> str:
+    """Get the path of an event's database
+
+    Args:
+        directory (str): Transfer directory
+        event_id (str): Event code
+
+    Returns:
+        str: Path to {event_id}.sqlite3
+    """
+    return os.path.join(directory, f"{event_id}.sqlite3")
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+class EventDatabase:
+    """
+    One table per form, with a unique index on the dedupe key columns
+
+    Repeats the user chose to import anyway are kept, numbered by `_repeat`.
+    """
+
+    def __init__(
+        self, path: str, durability: storage.Durability = storage.Durability.GROUP
+    ) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self.set_durability(durability)
+
+        self._inserts: dict[str, str] = {}
+        with self._connection:
+            for form, header in schema.HEADERS.items():
+                self._create(form, header)
+
+    def _create(self, form: str, header: list[str]) -> None:
+        key_columns = [TEAM_COLUMN]
+        if len(key_index.KEY_COLUMNS[form]) > 1:
+            key_columns.append(MATCH_COLUMN)
+
+        columns = [*header, *key_columns, REPEAT_COLUMN]
+        self._connection.execute(
+            f"CREATE TABLE IF NOT EXISTS {_quote(form)} "
+            f"({', '.join(_quote(column) for column in columns)})"
+        )
+        existing = [
+            row[1]
+            for row in self._connection.execute(f"PRAGMA table_info({_quote(form)})")
+        ]
+        if existing != columns:
+            raise sqlite3.DatabaseError(
+                f"{self.path}: {form} table columns do not match the {form} form"
+            )
+
+        self._connection.execute(
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {_quote(form + '_key')} ON "
+            f"{_quote(form)} ({', '.join(map(_quote, key_columns + [REPEAT_COLUMN]))})"
+        )
+
+        where = " AND ".join(f"{_quote(column)} IS ?" for column in key_columns)
+        self._inserts[form] = (
+            f"INSERT INTO {_quote(form)} "
+            f"({', '.join(map(_quote, columns))}) VALUES "
+            f"({', '.join('?' * (len(header) + len(key_columns)))}, "
+            f"(SELECT COUNT(*) FROM {_quote(form)} WHERE {where}))"
+        )
+
+    def set_durability(self, durability: storage.Durability) -> None:
+        """Set when commits are synced to disk
+
+        Args:
+            durability (storage.Durability): Durability policy
+        """
+        with self._lock:
+            self._connection.execute(f"PRAGMA synchronous={SYNCHRONOUS[durability]}")
+
+    def insert(self, form: str, rows: list[list], keys: list) -> None:
+        """Insert rows in one transaction
+
+        Args:
+            form (str): Form name
+            rows (list[list]): Row values as decoded
+            keys (list): Dedupe key of each row, from `key_index.KeyIndex.key`
+        """
+        parameters = []
+        for values, key in zip(rows, keys):
+            key = key or (None,) * len(key_index.KEY_COLUMNS[form])
+            parameters.append([*map(_sql_value, values), *key, *key])
+
+        with self._lock, self._connection:
+            self._connection.executemany(self._inserts[form], parameters)
+
+    def read(self, form: str) -> pandas.DataFrame:
+        """Read a form's scans in insertion order
+
+        Args:
+            form (str): Form name
+
+        Returns:
+            pandas.DataFrame: Typed frame
+        """
+        return self._select(form, "", ())
+
+    def team(self, form: str, team) -> pandas.DataFrame:
+        """Read every scan of one team
+
+        Args:
+            form (str): Form name
+            team (Any): Team number, e.g. 6369 or "frc6369"
+
+        Returns:
+            pandas.DataFrame: Typed frame
+        """
+        return self._select(
+            form, f"WHERE {_quote(TEAM_COLUMN)} = ?", (key_index.team_number(team),)
+        )
+
+    def contains(self, form: str, key: tuple[int, ...] | None) -> bool:
+        """Check if a scan with a dedupe key is stored
+
+        Args:
+            form (str): Form name
+            key (tuple[int, ...] | None): Key from `key_index.KeyIndex.key`
+
+        Returns:
+            bool: Whether the key is present
+        """
+        if key is None:
+            return False
+        columns = [TEAM_COLUMN, MATCH_COLUMN][: len(key)]
+        where = " AND ".join(f"{_quote(column)} = ?" for column in columns)
+        with self._lock:
+            cursor = self._connection.execute(
+                f"SELECT 1 FROM {_quote(form)} WHERE {where} LIMIT 1", key
+            )
+            return cursor.fetchone() is not None
+
+    def count(self, form: str) -> int:
+        """Number of scans of a form
+
+        Args:
+            form (str): Form name
+
+        Returns:
+            int: Row count
+        """
+        with self._lock:
+            return self._connection.execute(
+                f"SELECT COUNT(*) FROM {_quote(form)}"
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """
+        Close the database
+        """
+        with self._lock:
+            self._connection.close()
+
+    def _select(self, form: str, where: str, parameters: tuple) -> pandas.DataFrame:
+        columns = ", ".join(map(_quote, schema.HEADERS[form]))
+        with self._lock:
+            rows = self._connection.execute(
+                f"SELECT {columns} FROM {_quote(form)} {where} ORDER BY rowid",
+                parameters,
+            ).fetchall()
+        if not rows:
+            return schema.empty_frame(form)
+
+        types = list(schema.dtypes(form).values())
+        try:
+            return schema.from_values(
+                [
+                    [_python_value(value, dtype) for value, dtype in zip(row, types)]
+                    for row in rows
+                ],
+                form,
+            )
+        except (TypeError, ValueError):
+            # a column imported from a CSV that didn't fit its type
+            logging.warning("%s: %s has untyped values", self.path, form)
+            text = [
+                ["" if value is None else str(value) for value in row] for row in rows
+            ]
+            return schema.apply(
+                pandas.DataFrame(text, columns=schema.HEADERS[form]), form
+            )
+
+
+def _sql_value(value):
+    if hasattr(value, "item"):  # numpy scalar
+        value = value.item()
+    if value is pandas.NA or (isinstance(value, float) and value != value):
+        return None
+    return value
+
+
+def _python_value(value, dtype: str):
+    if dtype == schema.BOOL and value is not None:
+        return bool(value)
+    return value
+
+
+def insert_frame(database: EventDatabase, form: str, frame: pandas.DataFrame) -> None:
+    """Insert typed rows in one transaction
+
+    Args:
+        database (EventDatabase): Target database
+        form (str): Form name
+        frame (pandas.DataFrame): Typed rows of the form
+    """
+    index = key_index.KeyIndex()
+    rows = frame.astype(object).where(frame.notna(), None).values.tolist()
+    keys = [index.record_key(form, dict(zip(frame.columns, row))) for row in rows]
+    database.insert(form, rows, keys)
+
+
+def import_frames(
+    database: EventDatabase, data_frames: dict[str, pandas.DataFrame]
+) -> None:
+    """Copy loaded totals into an empty database, e.g. when switching backends
+
+    Args:
+        database (EventDatabase): Target database
+        data_frames (dict[str, pandas.DataFrame]): Data for each form
+    """
+    for form, frame in data_frames.items():
+        if not frame.empty:
+            insert_frame(database, form, frame)
+            logging.info("Imported %s %s rows into %s", len(frame), form, database.path)
@@ -0,0 +1,324 @@
+"""
+Persistence for per-form totals files
+"""
+
+import os
+import enum
+import logging
+import threading
+import typing
+
+import pandas
+
+
+class Durability(enum.Enum):
+    """When written data is forced to stable storage with fsync"""
+
+    SYNC = "sync"  # every write
+    GROUP = "group"  # every `group_size` writes or `group_interval` seconds
+    BUFFERED = "buffered"  # left to the OS
+
+
+def recover(path: str) -> int:
+    """Drop a partial last row left by a crash during an append
+
+    Args:
+        path (str): Totals file
+
+    Returns:
+        int: Number of bytes removed
+    """
+    with open(path, "rb+") as file:
+        size = file.seek(0, os.SEEK_END)
+        if size == 0:
+            return 0
+        file.seek(size - 1)
+        if file.read(1) == b"\n":
+            return 0
+
+        # find the end of the last complete row
+        end = size
+        while end > 0:
+            start = max(end - 4096, 0)
+            file.seek(start)
+            newline = file.read(end - start).rfind(b"\n")
+            if newline != -1:
+                end = start + newline + 1
+                break
+            end = start
+        file.truncate(end)
+
+    logging.warning("Removed %s bytes of a partial row from %s", size - end, path)
+    return size - end
+
+
+def count_rows(path: str) -> int:
+    """Count the data rows of a totals file without parsing it
+
+    Args:
+        path (str): Totals file
+
+    Returns:
+        int: Number of rows below the header, 0 for an empty file
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    if b'"' not in data:
+        records = data.count(b"\n")
+    else:
+        # a newline inside a quoted field doesn't end the record
+        records = 0
+        quoted = False
+        for line in data.split(b"\n")[:-1]:
+            quoted ^= line.count(b'"') % 2 == 1
+            records += not quoted
+    if data and not data.endswith(b"\n"):
+        records += 1
+    return max(records - 1, 0)
+
+
+def _fsync_directory(directory: str) -> None:
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:  # not supported on this platform
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def totals_path(directory: str, form: str, event_id: str) -> str:
+    """Get the path of a totals file
+
+    Args:
+        directory (str): Transfer directory or disk mountpoint
+        form (str): Form name (pit, qual, playoff)
+        event_id (str): Event code
+
+    Returns:
+        str: Path to {event_id}_{form}_total.csv
+    """
+    return os.path.join(directory, form, f"{event_id}_{form}_total.csv")
+
+
+class TotalsWriter:
+    """
+    Append-only writer for {event_id}_{form}_total.csv files
+
+    New rows are appended to the end of the file and the header is only written
+    when the file is created. A file is rewritten in full (compacted) when the
+    writer does not know it to be in sync with the in-memory frame, every
+    `compact_interval` appends, or when `compact` is called.
+
+    Rewrites go to a temporary file that is renamed over the old one, so a
+    crash leaves either the old or the new file. Appends are fsynced according
+    to the `Durability` policy.
+
+    Append handles are kept open within a commit group (in BUFFERED mode they
+    are closed when the group ends), call `close` when done.
+    """
+
+    def __init__(
+        self,
+        compact_interval: int = 0,
+        durability: Durability = Durability.BUFFERED,
+        group_size: int = 16,
+        group_interval: float = 1.0,
+    ) -> None:
+        self.compact_interval = compact_interval
+        self.durability = durability
+        self.group_size = group_size
+        self.group_interval = group_interval
+
+        self._lock = threading.Lock()
+        self._rows: dict[str, int] = {}  # rows known to be on disk, per path
+        self._appends: dict[str, int] = {}  # appends since last compaction
+        self._handles: dict[str, typing.TextIO] = {}
+        self._unsynced: set[str] = set()  # paths appended to since the last fsync
+        self._group_writes = 0
+        self._group_timer: threading.Timer | None = None
+
+    def append(
+        self, directory: str, form: str, event_id: str, frame: pandas.DataFrame
+    ) -> None:
+        """Persist the rows of a form's frame that are not in the file yet
+
+        Args:
+            directory (str): Transfer directory or disk mountpoint
+            form (str): Form name
+            event_id (str): Event code
+            frame (pandas.DataFrame): Full frame for the form, new rows last
+        """
+        path = totals_path(directory, form, event_id)
+
+        with self._lock:
+            due = (
+                self.compact_interval > 0
+                and self._appends.get(path, 0) >= self.compact_interval
+            )
+            written = self._rows.get(path)
+            if due or written is None or written > len(frame):
+                self._compact(path, frame)
+                return
+            if written == len(frame):
+                return
+
+            if path not in self._handles:
+                self._handles[path] = open(  # pylint: disable=consider-using-with
+                    path, "a", encoding="utf-8", newline=""
+                )
+            handle = self._handles[path]
+            handle.write(frame.iloc[written:].to_csv(header=False, index=False))
+            handle.flush()
+            self._rows[path] = len(frame)
+            self._appends[path] = self._appends.get(path, 0) + 1
+            self._unsynced.add(path)
+            self._commit()
+
+    def compact(
+        self, directory: str, form: str, event_id: str, frame: pandas.DataFrame
+    ) -> None:
+        """Rewrite a totals file from the full frame
+
+        Args:
+            directory (str): Transfer directory or disk mountpoint
+            form (str): Form name
+            event_id (str): Event code
+            frame (pandas.DataFrame): Full frame for the form
+        """
+        with self._lock:
+            self._compact(totals_path(directory, form, event_id), frame)
+
+    def set_durability(self, durability: Durability) -> None:
+        """Change the durability policy, pending appends are committed first
+
+        Args:
+            durability (Durability): New policy
+        """
+        with self._lock:
+            self._sync()
+            self.durability = durability
+
+    def sync(self) -> None:
+        """
+        Force every append made so far to stable storage
+        """
+        with self._lock:
+            self._sync()
+
+    def mark_synced(self, directory: str, form: str, event_id: str, rows: int) -> None:
+        """Record that a totals file already holds `rows` rows (e.g. after loading it)
+
+        Args:
+            directory (str): Transfer directory or disk mountpoint
+            form (str): Form name
+            event_id (str): Event code
+            rows (int): Number of data rows in the file
+        """
+        path = totals_path(directory, form, event_id)
+        with self._lock:
+            self._rows[path] = rows
+            self._appends[path] = 0
+
+    def forget(self, directory: str) -> None:
+        """Forget tracked files below a directory (e.g. a disk that was re-inserted)
+
+        Args:
+            directory (str): Transfer directory or disk mountpoint
+        """
+        prefix = directory.rstrip(os.sep) + os.sep  # not /media/usb2 for /media/usb
+        with self._lock:
+            for path in [p for p in self._rows if p.startswith(prefix)]:
+                del self._rows[path]
+                self._appends.pop(path, None)
+                self._close_handle(path)
+
+    def reset(self) -> None:
+        """
+        Forget all tracked files, the next write to each will be a full rewrite
+        """
+        with self._lock:
+            self._rows.clear()
+            self._appends.clear()
+            for path in list(self._handles):
+                self._close_handle(path)
+
+    def close(self) -> None:
+        """
+        Commit pending appends and close all open append handles
+        """
+        with self._lock:
+            self._sync()
+            for path in list(self._handles):
+                self._close_handle(path)
+
+    def _close_handle(self, path: str) -> None:
+        if path in self._unsynced and self.durability != Durability.BUFFERED:
+            self._fsync(path)
+        self._unsynced.discard(path)
+
+        handle = self._handles.pop(path, None)
+        if handle:
+            try:
+                handle.close()
+            except OSError:  # disk may already be gone
+                logging.warning("Failed to close %s", path)
+
+    def _fsync(self, path: str) -> None:
+        if path not in self._handles:
+            return
+        try:
+            os.fsync(self._handles[path].fileno())
+        except OSError:  # disk may already be gone
+            logging.warning("Failed to sync %s", path)
+        self._unsynced.discard(path)
+
+    def _sync(self) -> None:
+        if self._group_timer:
+            self._group_timer.cancel()
+            self._group_timer = None
+        self._group_writes = 0
+        for path in list(self._unsynced):
+            if self.durability == Durability.BUFFERED:
+                # no fsync, but don't keep a removable volume busy between groups
+                self._close_handle(path)
+            else:
+                self._fsync(path)
+        self._unsynced.clear()
+
+    def _commit(self) -> None:
+        if self.durability == Durability.SYNC:
+            self._sync()
+        else:  # GROUP fsyncs, BUFFERED closes its handles, once per group
+            self._group_writes += 1
+            if self._group_writes >= self.group_size:
+                self._sync()
+            elif self._group_timer is None:
+                self._group_timer = threading.Timer(self.group_interval, self.sync)
+                self._group_timer.daemon = True
+                self._group_timer.start()
+
+    def _compact(self, path: str, frame: pandas.DataFrame) -> None:
+        self._close_handle(path)
+
+        directory = os.path.dirname(path)
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+            logging.info("Created directory %s", directory)
+
+        temp_path = f"{path}.tmp"
+        with open(temp_path, "w", encoding="utf-8", newline="") as file:
+            frame.to_csv(file, index=False)
+            if self.durability != Durability.BUFFERED:
+                file.flush()
+                os.fsync(file.fileno())
+        os.replace(temp_path, path)
+        if self.durability != Durability.BUFFERED:
+            _fsync_directory(directory)
+
+        self._rows[path] = len(frame)
+        self._appends[path] = 0
+        logging.info("Compacted %s (%s rows)", path, len(frame))
@@ -0,0 +1,73 @@
+"""
+Tests for the payload decoder
+"""
+
+import unittest
+
+import pandas
+
+import decoder
+import schema
+
+
+def _payload(form: str, **fields: str) -> str:
+    sample = {
+        schema.INT: "3",
+        schema.FLOAT: "2.5",
+        schema.BOOL: "true",
+        schema.CATEGORY: "blue1",
+        schema.STRING: "drove well",
+    }
+    values = [
+        fields.get(column, form if column == "form" else sample[dtype])
+        for column, dtype in schema.dtypes(form).items()
+    ]
+    values[schema.HEADERS[form].index("teamNumber")] = "frc6369"
+    return "||".join(values)
+
+
+class DecodeNullTest(unittest.TestCase):
+    """
+    Tablets send "null" for fields that were left empty
+    """
+
+    def setUp(self) -> None:
+        self.decoder = decoder.PayloadDecoder()
+
+    def test_null_booleans(self) -> None:
+        result = self.decoder.decode(
+            _payload("qual", hasAuton="null", autonLeave="NULL")
+        )
+        self.assertEqual(result.errors, [])
+        self.assertIsNone(result.record["hasAuton"])
+        self.assertIsNone(result.record["autonLeave"])
+        self.assertIsNone(decoder.validate(result))
+
+    def test_null_text(self) -> None:
+        result = self.decoder.decode(
+            _payload("qual", startingPosition="null", endgameComments="null")
+        )
+        self.assertEqual(result.errors, [])
+        self.assertIsNone(result.record["startingPosition"])
+        self.assertIsNone(result.record["endgameComments"])
+
+        frame = schema.from_values([result.values], "qual")
+        self.assertTrue(pandas.isna(frame["startingPosition"].iloc[0]))
+        self.assertTrue(pandas.isna(frame["endgameComments"].iloc[0]))
+        self.assertNotIn("null", frame["startingPosition"].cat.categories)
+
+    def test_null_numbers(self) -> None:
+        result = self.decoder.decode(
+            _payload("qual", autonSpeakerNotesScored="null", endgameClimbSpeed="null")
+        )
+        self.assertEqual(result.errors, [])
+        self.assertIsNone(result.record["autonSpeakerNotesScored"])
+        self.assertIsNone(result.record["endgameClimbSpeed"])
+
+    def test_bad_boolean_is_rejected(self) -> None:
+        result = self.decoder.decode(_payload("qual", hasAuton="maybe"))
+        self.assertEqual([error.column for error in result.errors], ["hasAuton"])
+
+
+if __name__ == "__main__":
+    unittest.main()